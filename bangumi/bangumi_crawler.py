@@ -1,118 +1,419 @@
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import glob
+import os
+
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import unicodedata
+
+from crawl_state import CrawlCheckpoint, migrate_legacy_checkpoint
+from dataset_store import DatasetWriter, export_csv, merge_shards, patch_csv, read_dataset
+from http_client import (CACHE_REQUESTS, FetchError, HttpClient, RATE_WAIT_SECONDS, REQUEST_ERRORS, REQUEST_SECONDS,
+                         RESPONSE_BYTES)
+import incremental
+from metrics import REGISTRY, JsonlReporter, StackSampler, serve
+from page_cache import PageCache
+from page_parser import PARSERS, get_parser, subject_id
+from retry_policy import BREAKER_TRIPS, RETRIES, CircuitBreaker, RetryPolicy
 
 BASE_URL = "https://bangumi.tv/anime/browser/airtime/{year}?sort=title&page={page}"
-HEADERS = {
-    "User-Agent": "zemi/bangumi-research/0.1 (https://github.com/zemi/bangumi-research)"
-}
+# subject_id 取自条目页 URL，是条目的唯一键（不同条目可能同名）
+COLUMNS = ['name', 'name_cn', 'info', 'score', 'score_count', 'rank', 'type', 'tags', 'subject_id']
+# 连续这么多个列表页失败时放弃本年剩余页（已抓取的页仍保存，下次运行只补抓失败页）
+MAX_LIST_FAILURES = 3
 
-# 清理不可见字符
-def clean_text(text):
-    return ''.join(c for c in text if unicodedata.category(c)[0] != 'C')
+PARSE_SECONDS = REGISTRY.histogram('crawler_parse_seconds', '单页 HTML 解析耗时', ['kind'],
+                                   buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+PAGES = REGISTRY.counter('crawler_pages', '已解析的页面数', ['kind'])
+ITEMS = REGISTRY.counter('crawler_items', '列表页解析出的条目数', ['year'])
+TAG_FAILURES = REGISTRY.counter('crawler_tag_failures', '重试后仍失败、记入死信队列的详情页数')
+TAG_PERMANENT_FAILURES = REGISTRY.counter('crawler_tag_permanent_failures', '返回不可重试的 4xx、记为最终失败的详情页数')
+LIST_FAILURES = REGISTRY.counter('crawler_list_failures', '重试后仍失败、留待续抓的列表页数')
+DETAIL_QUEUE = REGISTRY.gauge('crawler_detail_queue_depth', '已提交未完成的详情页任务数')
+PENDING_PAGES = REGISTRY.gauge('crawler_pending_pages', '等待详情页返回、尚未写入的列表页数', ['year'])
 
-# 详情页标签抓取
-def fetch_tags(subject_url):
-    try:
-        resp = requests.get(subject_url, headers=HEADERS, timeout=10)
-        try:
-            resp.encoding = 'utf-8'
-            html = resp.text
-        except Exception:
-            resp.encoding = resp.apparent_encoding
-            html = resp.text
-        soup = BeautifulSoup(html, 'html.parser')
-        tag_spans = soup.select('div.subject_tag_section div.inner a.l span')
-        tags = [span.text.strip() for span in tag_spans]
-        tags_str = ','.join(tags)
-        return clean_text(tags_str)
-    except Exception as e:
-        print(f"标签抓取失败: {subject_url}, {e}")
-        return ''
-
-# 主列表页抓取
-def fetch_anime_list(year, max_pages=100, max_workers=20):
-    results = []
+# 详情页标签抓取；客户端重试后仍失败时抛出异常，由调用方记入死信队列
+def fetch_tags(client, subject_url, ttl=None, parser='bs4'):
+    status, html = client.get_text(subject_url, encoding='utf-8', ttl=ttl)
+    if status != 200:
+        raise FetchError(subject_url, status)
+    with PARSE_SECONDS.time(kind='tags'):
+        tags = get_parser(parser).parse_tags(html)
+    PAGES.inc(kind='tags')
+    return tags
+
+# 将详情页已全部返回的列表页写入列式存储和断点；wait=True 时等待所有页完成
+# 标签抓取失败的条目先以空标签（增量模式下为上次的标签）写入，同时记入死信队列，之后定向重抓回填；
+# 不可重试的 4xx 只记为最终失败
+def flush_pages(store, checkpoint, year, pending, wait=False):
+    remaining = []
+    for page, anime_data, futures in pending:
+        if not wait and not all(f.done() for f in futures if f):
+            remaining.append((page, anime_data, futures))
+            continue
+        for anime, future in zip(anime_data, futures):
+            try:
+                anime['tags'] = future.result() if future else anime.get('tags', '')
+            except Exception as e:
+                anime['tags'] = anime.get('tags', '')
+                record = {'year': year, 'page': page, 'subject_id': anime['subject_id'], 'name': anime['name'],
+                          'name_cn': anime['name_cn'], 'url': anime['subject_url'], 'error': repr(e)}
+                if isinstance(e, FetchError) and e.permanent:
+                    TAG_PERMANENT_FAILURES.inc()
+                    print(f"标签抓取最终失败, 不再重抓: {anime['subject_url']}, {e}")
+                    checkpoint.permanent_failures.add(record)
+                else:
+                    TAG_FAILURES.inc()
+                    print(f"标签抓取失败, 已记入死信队列: {anime['subject_url']}, {e}")
+                    checkpoint.dead_letters.add(record)
+            del anime['subject_url']
+        store.write_page(year, page, anime_data)
+        checkpoint.save_page(year, page, [{'name': anime['name'], 'name_cn': anime['name_cn'],
+                                           'subject_id': anime['subject_id']} for anime in anime_data])
+    return remaining
+
+# 单年列表页抓取：列表页顺序翻页，详情页提交到共享线程池，不等待当前页完成即翻下一页
+# 已有断点的页直接跳过，整年完成的年份直接跳过；结果逐页写入 store，返回本年条目数
+# 重试后仍失败的列表页跳过继续翻页，本年不标记完成，下次运行只补抓这些页
+# 增量模式（previous 为上次数据的索引）下列表页总是重新验证，只为新条目或评分/排名变化的条目抓详情页
+def crawl_year(client, year, detail_pool, store, checkpoint, max_pages=100, previous=None, parser='bs4'):
+    ttl = 0 if previous is not None else None
+    if checkpoint.is_year_done(year):
+        count = len(checkpoint.load_year(year))
+        print(f"{year} 已有断点, 跳过抓取, 共: {count}")
+        return count
+    if not checkpoint.pages(year):
+        store.clear_year(year)
+    pending = []
+    finished = True
+    failures = 0
     for page in range(1, max_pages+1):
+        if checkpoint.has_page(year, page):
+            continue
         url = BASE_URL.format(year=year, page=page)
-        resp = requests.get(url, headers=HEADERS)
-        resp.encoding = resp.apparent_encoding
-        if year == 2015 and page == 1:
-            with open('test.html', 'w', encoding='utf-8') as f:
-                f.write(resp.text)
-            print("已保存 test.html，请用浏览器打开检查内容。")
-        if resp.status_code != 200:
-            print(f"Error: {resp.status_code} at {url}")
-            break
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        items = soup.select('ul#browserItemList > li.item')
-        if not items:
+        try:
+            status, html = client.get_text(url, ttl=ttl)
+            error = None if status == 200 else f"HTTP {status}"
+        except requests.RequestException as e:
+            error = repr(e)
+        if error:
+            LIST_FAILURES.inc()
+            finished = False
+            failures += 1
+            print(f"Error: {error} at {url}, 留待下次续抓")
+            if failures >= MAX_LIST_FAILURES:
+                print(f"{year} 连续 {failures} 页失败, 放弃本年剩余页")
+                break
+            continue
+        failures = 0
+        with PARSE_SECONDS.time(kind='list'):
+            anime_data = get_parser(parser).parse_list_page(html)
+        PAGES.inc(kind='list')
+        if not anime_data:
             break
-        anime_data = []
-        for item in items:
-            name = item.select_one('div.inner h3 a.l')
-            name_cn = item.select_one('div.inner h3 small.grey')
-            info = item.select_one('div.inner p.info.tip')
-            score = item.select_one('div.inner p.rateInfo small.fade')
-            score_count = item.select_one('div.inner p.rateInfo span.tip_j')
-            rank = item.select_one('div.inner span.rank')
-            type_name = ''
-            class_list = item.get('class', [])
-            for c in class_list:
-                if c in ['tv', 'movie', 'ova', 'web', 'anime_comic', 'misc']:
-                    type_name = c
-                    break
-            subject_url = 'https://bangumi.tv' + name['href'] if name and name.has_attr('href') else ''
-            anime_data.append({
-                'name': name.text.strip() if name else '',
-                'name_cn': name_cn.text.strip() if name_cn else '',
-                'info': info.text.strip() if info else '',
-                'score': score.text.strip() if score else '',
-                'score_count': score_count.text.strip() if score_count else '',
-                'rank': rank.text.strip() if rank else '',
-                'type': type_name,
-                'subject_url': subject_url
-            })
-        # 多线程抓取详情页标签
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_idx = {executor.submit(fetch_tags, anime['subject_url']): idx for idx, anime in enumerate(anime_data) if anime['subject_url']}
-            for future in as_completed(future_to_idx):
-                idx = future_to_idx[future]
-                try:
-                    tags = future.result()
-                except Exception as exc:
-                    tags = ''
-                anime_data[idx]['tags'] = tags
+        ITEMS.inc(len(anime_data), year=year)
+        futures = []
         for anime in anime_data:
-            if 'tags' not in anime:
-                anime['tags'] = ''
-            del anime['subject_url']
-        results.extend(anime_data)
-        print(f"{year} 第{page}页, 累计: {len(results)}")
-        time.sleep(0.5)
-    return results
-
-all_data = []
-for year in range(2015, 2025):
-    print(f"抓取 {year} 年...")
-    year_data = fetch_anime_list(year, max_workers=20)
-    all_data.extend(year_data)
-    print(f"{year}年完成, 累计: {len(all_data)}")
-
-# 保证字段顺序和表头一致
-columns = ['name', 'name_cn', 'info', 'score', 'score_count', 'rank', 'type', 'tags']
-df = pd.DataFrame(all_data, columns=columns)
-df.to_csv("bangumi_anime_2015_2024.csv", index=False, encoding="utf-8-sig")
-print("数据已保存到 bangumi_anime_2015_2024.csv")
+            tags = incremental.reusable_tags(anime, previous) if previous is not None else None
+            if tags is not None:
+                anime['tags'] = tags
+                futures.append(None)
+            elif anime['subject_url']:
+                if previous is not None:
+                    anime['tags'] = incremental.previous_tags(anime, previous)
+                future = detail_pool.submit(fetch_tags, client, anime['subject_url'], ttl, parser)
+                DETAIL_QUEUE.inc()
+                future.add_done_callback(lambda f: DETAIL_QUEUE.dec())
+                futures.append(future)
+            else:
+                futures.append(None)
+        pending.append((page, anime_data, futures))
+        pending = flush_pages(store, checkpoint, year, pending)
+        PENDING_PAGES.set(len(pending), year=year)
+        fetched = sum(1 for f in futures if f)
+        print(f"{year} 第{page}页, 本页: {len(anime_data)}, 抓取详情: {fetched}")
+    flush_pages(store, checkpoint, year, pending, wait=True)
+    PENDING_PAGES.set(0, year=year)
+    if finished:
+        checkpoint.mark_year_done(year)
+    return len(checkpoint.load_year(year))
+
+# 多年份并行抓取，所有年份共享一个连接池和详情页线程池
+def crawl(years, client, store, checkpoint, max_pages=100, max_workers=20, previous=None, parser='bs4'):
+    total = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as detail_pool, \
+            ThreadPoolExecutor(max_workers=len(years)) as list_pool:
+        year_futures = [(year, list_pool.submit(crawl_year, client, year, detail_pool, store, checkpoint,
+                                                max_pages, previous, parser))
+                        for year in years]
+        for year, future in year_futures:
+            total += future.result()
+            print(f"{year}年完成, 累计: {total}")
+    return total
 
 # 检查tags中包含疑似乱码的行（包含或不可见字符）
 def is_garbled(s):
     return '' in s or any(ord(c) < 32 and c not in '\t\n\r' for c in s)
 
-garbled_rows = df[df['tags'].apply(is_garbled)]
-if not garbled_rows.empty:
-    print("疑似乱码的tags行：")
-    print(garbled_rows[['name', 'tags']]) 
\ No newline at end of file
+def parse_shard(value):
+    index, count = (int(x) for x in value.split('/'))
+    if not 0 <= index < count:
+        raise ValueError(f"分片编号应在 0..{count - 1} 之间: {value}")
+    return index, count
+
+# 年份按轮转方式分配到各分片，相邻年份落在不同分片，负载更均匀
+def shard_years(years, index, count):
+    return years[index::count]
+
+def shard_store(store, index):
+    return f'{store}.shard{index}'
+
+# 抓取一组年份写入 store_root；每个进程/机器各自的连接池、限速和断点目录
+# rate_divisor 为同时运行的分片数，多进程时按比例分摊限速，总请求速率不变
+def run_shard(args, years, store_root, previous=None, rate_divisor=1):
+    if not years:
+        return 0
+    client = make_client(args, args.max_workers + len(years), rate_divisor)
+    checkpoint = open_checkpoint(args, store_root)
+    # 增量模式要重新验证所有列表页，断点中已完成的年份不能跳过
+    if args.fresh or args.incremental:
+        checkpoint.reset()
+    try:
+        print(f"抓取 {', '.join(str(y) for y in years)} 年 -> {store_root}")
+        store = DatasetWriter(store_root, COLUMNS)
+        return crawl(years, client, store, checkpoint, max_pages=args.max_pages,
+                     max_workers=args.max_workers, previous=previous, parser=args.parser)
+    finally:
+        client.close()
+        print_breakdown()
+
+# 每个数据集（含各分片）的断点目录为 state_dir/<store 名>；不分片的 store 沿用旧版直接存放在 state_dir 下的断点
+def open_checkpoint(args, store_root):
+    root = os.path.join(args.state_dir, os.path.basename(store_root))
+    if store_root == args.store and migrate_legacy_checkpoint(args.state_dir, root):
+        print(f"已将旧版断点 {args.state_dir}/ 迁移到 {root}/")
+    return CrawlCheckpoint(root)
+
+def make_client(args, pool_size, rate_divisor=1):
+    cache = None if args.no_cache else PageCache(args.cache_path, ttl=args.cache_ttl)
+    client = HttpClient(global_rate=args.global_rate / rate_divisor, host_rate=args.host_rate / rate_divisor,
+                        pool_size=pool_size, cache=cache,
+                        retry=RetryPolicy(max_attempts=args.max_attempts, base_delay=args.retry_base_delay))
+    client.breaker = CircuitBreaker(client.global_limiter, error_rate=args.breaker_error_rate,
+                                    cooldown=args.breaker_cooldown)
+    return client
+
+# 定向重抓死信队列（含各分片的队列）中的详情页：成功的标签回填到对应数据集（分片及合并后的 store），
+# 仍失败的留在队列中，不可重试的 4xx 记为最终失败并移出队列；按 subject id 回填，返回 {subject_id: 标签}
+def retry_dead_letters(args):
+    # 分片的断点目录在 state_dir 下以 <store>.shardI 命名，分片数据可能在其他机器上，以断点目录为准
+    shard_dirs = glob.glob(os.path.join(glob.escape(args.state_dir), glob.escape(os.path.basename(args.store)) + '.shard*'))
+    roots = [args.store] + sorted(shard_store(args.store, os.path.basename(d).rsplit('.shard', 1)[1]) for d in shard_dirs)
+    checkpoints = [(root, open_checkpoint(args, root)) for root in roots]
+    entries = [(root, checkpoint, record) for root, checkpoint in checkpoints for record in checkpoint.dead_letters.load()]
+    if not entries:
+        print("死信队列为空")
+        return {}
+    print(f"重抓死信队列中的 {len(entries)} 个详情页")
+    client = make_client(args, args.max_workers)
+    updates = defaultdict(lambda: defaultdict(dict))
+    remaining = defaultdict(list)
+    permanent = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+            futures = [(root, checkpoint, record, pool.submit(fetch_tags, client, record['url'], None, args.parser))
+                       for root, checkpoint, record in entries]
+            for root, checkpoint, record, future in futures:
+                try:
+                    tags = future.result()
+                except Exception as e:
+                    record['error'] = repr(e)
+                    record['attempts'] = record.get('attempts', 1) + 1
+                    if isinstance(e, FetchError) and e.permanent:
+                        TAG_PERMANENT_FAILURES.inc()
+                        checkpoint.permanent_failures.add(record)
+                        permanent += 1
+                    else:
+                        remaining[checkpoint.root].append(record)
+                    continue
+                # 旧版死信记录没有 subject_id，从 URL 中取
+                key = record.get('subject_id') or subject_id(record['url'])
+                for target in {root, args.store}:
+                    updates[target][record['year']][key] = tags
+    finally:
+        client.close()
+    updated = 0
+    for target, years in updates.items():
+        if not os.path.isdir(target):
+            continue
+        store = DatasetWriter(target, COLUMNS)
+        for year, values in years.items():
+            count = store.update_column(year, 'tags', values)
+            if target == args.store:
+                updated += count
+    for root, checkpoint in checkpoints:
+        checkpoint.dead_letters.replace(remaining.get(checkpoint.root, []))
+    print(f"已回填 {updated} 条标签, 仍失败 {sum(len(v) for v in remaining.values())} 条（保留在死信队列中）, "
+          f"最终失败 {permanent} 条（已移出队列）")
+    return {key: tags for years in updates.get(args.store, {}).values() for key, tags in years.items()}
+
+# 多进程分片的子进程入口：各进程的指标分别导出（端口号依次加一，JSONL/火焰图文件加 .shardI 后缀）
+def run_shard_process(args, index, years, store_root, previous=None, rate_divisor=1):
+    stop = start_metrics(args, index)
+    try:
+        return run_shard(args, years, store_root, previous, rate_divisor)
+    finally:
+        stop()
+
+# 本进程的抓取耗时构成（各线程累计）：网络请求、HTML 解析、限速等待，判断慢在网络、解析还是限速
+def print_breakdown():
+    network, parse, wait = REQUEST_SECONDS.total(), PARSE_SECONDS.total(), RATE_WAIT_SECONDS.total()
+    print(f"请求 {REQUEST_SECONDS.count()} 次, 下载 {RESPONSE_BYTES.total() / 1e6:.1f}MB, "
+          f"缓存命中 {CACHE_REQUESTS.value(result='hit')}, 请求异常 {REQUEST_ERRORS.total()}, "
+          f"重试 {RETRIES.total()}, 熔断 {BREAKER_TRIPS.total()}, "
+          f"死信 {TAG_FAILURES.total()}, 最终失败 {TAG_PERMANENT_FAILURES.total()}, 列表页失败 {LIST_FAILURES.total()}")
+    total = network + parse + wait
+    if total > 0:
+        print(f"耗时构成（线程累计）: 网络 {network:.1f}s ({network / total:.0%}), "
+              f"解析 {parse:.1f}s ({parse / total:.0%}), 限速等待 {wait:.1f}s ({wait / total:.0%})")
+
+# 按命令行参数启动指标导出和采样分析，返回停止函数；index 为多进程分片编号
+def start_metrics(args, index=None):
+    suffix = f'.shard{index}' if index is not None else ''
+    stops = []
+    if args.metrics_port:
+        port = args.metrics_port + (index + 1 if index is not None else 0)
+        server = serve(port)
+        stops.append(server.shutdown)
+        print(f"指标端点: http://localhost:{port}/metrics")
+    if args.metrics_jsonl:
+        reporter = JsonlReporter(args.metrics_jsonl + suffix, args.metrics_interval,
+                                 extra={'shard': index}).start()
+        stops.append(reporter.stop)
+    if args.profile:
+        sampler = StackSampler(args.profile_interval).start()
+        stops.append(lambda: sampler.stop(args.profile + suffix))
+
+    def stop():
+        for fn in reversed(stops):
+            fn()
+    return stop
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Bangumi 动漫数据抓取')
+    parser.add_argument('--start-year', type=int, default=2015)
+    parser.add_argument('--end-year', type=int, default=2024)
+    parser.add_argument('--max-pages', type=int, default=100)
+    parser.add_argument('--max-workers', type=int, default=20, help='详情页并发线程数')
+    parser.add_argument('--global-rate', type=float, default=16, help='全局每秒请求数上限')
+    parser.add_argument('--host-rate', type=float, default=8, help='单域名每秒请求数上限')
+    parser.add_argument('--parser', default='bs4', choices=list(PARSERS), help='HTML 解析后端')
+    parser.add_argument('--cache-path', default='bangumi_cache.sqlite', help='页面缓存文件')
+    parser.add_argument('--cache-ttl', type=float, default=86400, help='缓存有效秒数，过期后条件请求重新验证')
+    parser.add_argument('--no-cache', action='store_true', help='不使用页面缓存')
+    parser.add_argument('--state-dir', default='crawl_state', help='断点目录')
+    parser.add_argument('--fresh', action='store_true', help='清空断点重新抓取（页面缓存仍可命中）')
+    parser.add_argument('--incremental', metavar='PREV_CSV',
+                        help='增量模式：与上次数据集比对，只为新条目或变化条目抓详情页并合并输出到 --csv（总是清空断点重新翻页）')
+    parser.add_argument('--store', default='bangumi_anime_store', help='按年份分区的 parquet 输出目录')
+    parser.add_argument('--csv', help='可选：抓取完成后导出的 CSV 文件')
+    parser.add_argument('--processes', type=int, default=1, help='本机多进程分片数，完成后自动合并')
+    parser.add_argument('--shard', metavar='I/N',
+                        help='只抓取第 I 个分片（共 N 个）的年份，输出到 <store>.shardI，用于多台机器分工')
+    parser.add_argument('--merge-shards', type=int, metavar='N',
+                        help='将 <store>.shard0 ~ <store>.shard{N-1} 合并为 <store>，之后执行导出')
+    parser.add_argument('--max-attempts', type=int, default=5, help='单个请求的最多尝试次数（含首次）')
+    parser.add_argument('--retry-base-delay', type=float, default=0.5, help='指数退避的基础等待秒数')
+    parser.add_argument('--breaker-error-rate', type=float, default=0.5, help='最近请求错误率达到该值时熔断降速')
+    parser.add_argument('--breaker-cooldown', type=float, default=10, help='熔断后暂停的秒数')
+    parser.add_argument('--retry-dead-letters', action='store_true',
+                        help='只重抓死信队列中的详情页并回填标签，之后按 --csv 重新导出')
+    parser.add_argument('--metrics-port', type=int, help='在该端口提供 Prometheus 格式的 /metrics')
+    parser.add_argument('--metrics-jsonl', help='定期把指标快照追加到该 JSONL 文件')
+    parser.add_argument('--metrics-interval', type=float, default=10, help='JSONL 指标写入间隔（秒）')
+    parser.add_argument('--profile', metavar='PATH', help='开启采样分析，结束时写出 collapsed stack（火焰图输入）')
+    parser.add_argument('--profile-interval', type=float, default=0.01, help='采样间隔（秒）')
+    args = parser.parse_args(argv)
+    if args.incremental and not args.csv:
+        parser.error('--incremental 需要同时指定 --csv')
+    if args.merge_shards is not None and args.merge_shards < 1:
+        parser.error('--merge-shards 的分片数应不小于 1')
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(f'--shard 格式应为 I/N: {e}')
+    return args
+
+# argv 为命令行参数列表，流水线调度时直接传入；None 时读取 sys.argv
+def main(argv=None):
+    args = parse_args(argv)
+    stop = start_metrics(args)
+    try:
+        run(args)
+    finally:
+        stop()
+
+# 按解析好的参数抓取、合并分片并导出
+def run(args):
+    years = list(range(args.start_year, args.end_year + 1))
+    if args.retry_dead_letters:
+        backfilled = retry_dead_letters(args)
+        # 已有的 CSV 可能是增量合并或其他来源的结果，只按 subject id 改写回填的行，不用 store 重新导出覆盖
+        if args.csv and os.path.exists(args.csv):
+            count = patch_csv(args.csv, 'tags', backfilled)
+            print(f"已在 {args.csv} 中回填 {count} 条标签")
+        elif args.csv:
+            count = export_csv(args.store, args.csv, COLUMNS, years=years)
+            print(f"数据已导出到 {args.csv}, 共: {count}")
+        return
+
+    previous_df, previous = None, None
+    if args.incremental:
+        previous_df, previous = incremental.load_previous(args.incremental, COLUMNS)
+        print(f"增量模式, 上次数据: {len(previous_df)} 条")
+
+    if args.shard:
+        index, count = args.shard
+        root = shard_store(args.store, index)
+        total = run_shard(args, shard_years(years, index, count), root, previous)
+        print(f"分片 {index}/{count} 已保存到 {root}, 共: {total}；全部分片完成后使用 --merge-shards {count} 合并")
+        return
+    if args.processes > 1 or args.merge_shards:
+        if args.merge_shards is None:
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                futures = [pool.submit(run_shard_process, args, i, shard_years(years, i, args.processes),
+                                       shard_store(args.store, i), previous, args.processes)
+                           for i in range(args.processes)]
+                for future in futures:
+                    future.result()
+        # 只合并本次的 N 个分片，之前分片数更多时留下的 <store>.shardN 及以后的目录不参与合并
+        n_shards = args.merge_shards or args.processes
+        shard_roots = [shard_store(args.store, i) for i in range(n_shards)]
+        for root in shard_roots:
+            if not os.path.isdir(root):
+                print(f"分片 {root} 不存在（可能没有分到年份），跳过")
+        total = merge_shards(shard_roots, args.store, COLUMNS)
+        print(f"已合并 {n_shards} 个分片")
+    else:
+        total = run_shard(args, years, args.store, previous)
+    print(f"数据已保存到 {args.store}, 共: {total}")
+
+    # 保证字段顺序和表头一致
+    if previous_df is not None:
+        crawled = read_dataset(args.store, years=years, columns=COLUMNS)
+        df = incremental.merge(previous_df, crawled.to_dict('records'), COLUMNS)
+        df.to_csv(args.csv, index=False, encoding="utf-8-sig")
+        print(f"增量合并后数据已保存到 {args.csv}, 共: {len(df)}")
+    elif args.csv:
+        count = export_csv(args.store, args.csv, COLUMNS, years=years)
+        print(f"数据已导出到 {args.csv}, 共: {count}")
+
+    df = read_dataset(args.store, years=years, columns=['name', 'tags'])
+    garbled_rows = df[df['tags'].apply(is_garbled)]
+    if not garbled_rows.empty:
+        print("疑似乱码的tags行：")
+        print(garbled_rows[['name', 'tags']])
+
+if __name__ == '__main__':
+    main()
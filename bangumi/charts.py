@@ -0,0 +1,150 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from metrics import REGISTRY
+
+BACKENDS = ['matplotlib', 'vega-lite']
+# rcParams 是进程全局的，多语言共用一个进程时按图临时切换字体，渲染需要串行
+_render_lock = threading.Lock()
+
+CHART_CACHE_REQUESTS = REGISTRY.counter('chart_cache_requests', '图表缓存查询：hit/miss', ['backend', 'result'])
+CHART_BUILD_SECONDS = REGISTRY.histogram('chart_build_seconds', '缓存未命中时计算图表数据的耗时', ['backend'])
+CHART_RENDER_SECONDS = REGISTRY.histogram('chart_render_seconds', '缓存未命中时渲染图表的耗时', ['backend'])
+
+# 在分箱后的计数上做高斯核密度估计：计算量只与箱数和网格点数有关，与样本量无关
+# 带宽使用 Scott 规则（与 seaborn/scipy 默认一致），结果为概率密度
+def binned_kde(counts, edges, grid_size=200):
+    n = counts.sum()
+    if n < 2:
+        return np.array([]), np.array([])
+    centers = (edges[:-1] + edges[1:]) / 2
+    mean = np.average(centers, weights=counts)
+    std = np.sqrt(np.average((centers - mean) ** 2, weights=counts))
+    bandwidth = std * n ** (-1 / 5)
+    if bandwidth <= 0:
+        return np.array([]), np.array([])
+    grid = np.linspace(edges[0], edges[-1], grid_size)
+    z = (grid[:, None] - centers[None, :]) / bandwidth
+    density = (np.exp(-0.5 * z ** 2) * counts).sum(axis=1) / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+# 图表的中间描述：与渲染后端无关，matplotlib 和 Vega-Lite 都由它生成
+def histogram_chart(values, bins=20, xlabel='', ylabel='', title='', kde_bins=256):
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+    if not len(values):
+        counts, edges, grid, kde = np.zeros(0, dtype=int), np.zeros(1), np.array([]), np.array([])
+    else:
+        counts, edges = np.histogram(values, bins=bins)
+        # 核密度使用更细的分箱，再换算为与直方图相同的计数尺度
+        fine_counts, fine_edges = np.histogram(values, bins=kde_bins, range=(edges[0], edges[-1]))
+        grid, kde = binned_kde(fine_counts, fine_edges)
+        kde = kde * len(values) * (edges[1] - edges[0])
+    return {'kind': 'hist', 'edges': edges, 'counts': counts, 'kde_x': grid, 'kde_y': kde,
+            'xlabel': xlabel, 'ylabel': ylabel, 'title': title}
+
+# series: {图例名: pd.Series(index 为 x)}
+def line_chart(series, xlabel='', ylabel='', title='', legend=True, legend_title=None, figsize=None):
+    return {'kind': 'lines', 'series': {label: s for label, s in series.items()},
+            'xlabel': xlabel, 'ylabel': ylabel, 'title': title,
+            'legend': legend, 'legend_title': legend_title, 'figsize': figsize}
+
+# 直接使用 Figure 而不经过 pyplot，渲染后不留下全局图形对象；rc 为本图使用的 rcParams（如字体）
+def render_png(chart, rc=None):
+    with _render_lock, matplotlib.rc_context(rc):
+        return _render_png(chart)
+
+def _render_png(chart):
+    fig = Figure(figsize=chart.get('figsize'))
+    ax = fig.subplots()
+    if chart['kind'] == 'hist':
+        edges, counts = chart['edges'], chart['counts']
+        if len(counts):
+            ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.6, edgecolor='white')
+        if len(chart['kde_x']):
+            ax.plot(chart['kde_x'], chart['kde_y'])
+    else:
+        for label, s in chart['series'].items():
+            ax.plot(s.index, s.values, marker='o', label=label, linewidth=2)
+        if chart['legend'] and chart['series']:
+            ax.legend(loc='best', title=chart['legend_title'])
+    if chart['title']:
+        ax.set_title(chart['title'])
+    ax.set_xlabel(chart['xlabel'])
+    ax.set_ylabel(chart['ylabel'])
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    return buf.getvalue()
+
+def _json_value(v):
+    v = v.item() if hasattr(v, 'item') else v
+    return None if v is None or (isinstance(v, float) and np.isnan(v)) else v
+
+# Vega-Lite 规格：只传输聚合后的数据点，由浏览器端渲染
+def render_vega_lite(chart):
+    if chart['kind'] == 'hist':
+        edges, counts = chart['edges'], chart['counts']
+        bars = [{'start': _json_value(edges[i]), 'end': _json_value(edges[i + 1]), 'count': _json_value(c)}
+                for i, c in enumerate(counts)]
+        kde = [{'x': _json_value(x), 'y': _json_value(y)} for x, y in zip(chart['kde_x'], chart['kde_y'])]
+        return {
+            'title': chart['title'],
+            'layer': [
+                {'data': {'values': bars}, 'mark': {'type': 'bar', 'opacity': 0.6},
+                 'encoding': {'x': {'field': 'start', 'type': 'quantitative', 'title': chart['xlabel']},
+                              'x2': {'field': 'end'},
+                              'y': {'field': 'count', 'type': 'quantitative', 'title': chart['ylabel']}}},
+                {'data': {'values': kde}, 'mark': 'line',
+                 'encoding': {'x': {'field': 'x', 'type': 'quantitative'},
+                              'y': {'field': 'y', 'type': 'quantitative'}}},
+            ],
+        }
+    points = [{'x': _json_value(x), 'y': _json_value(y), 'series': str(label)}
+              for label, s in chart['series'].items() for x, y in zip(s.index, s.values)]
+    return {
+        'title': chart['title'],
+        'data': {'values': points},
+        'mark': {'type': 'line', 'point': True},
+        'encoding': {
+            'x': {'field': 'x', 'type': 'ordinal', 'title': chart['xlabel']},
+            'y': {'field': 'y', 'type': 'quantitative', 'title': chart['ylabel'], 'scale': {'zero': False}},
+            'color': {'field': 'series', 'type': 'nominal', 'title': chart['legend_title'],
+                      'legend': {} if chart['legend'] else None},
+        },
+    }
+
+# 有界 LRU：按 (筛选状态, 渲染后端) 缓存渲染结果，命中时不再计算数据也不再绘图
+class ChartCache:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_render(self, key, build, backend='matplotlib', rc=None):
+        if backend not in BACKENDS:
+            raise ValueError(f'未知的图表后端: {backend}')
+        key = (key, backend)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                CHART_CACHE_REQUESTS.inc(backend=backend, result='hit')
+                return self.entries[key]
+        CHART_CACHE_REQUESTS.inc(backend=backend, result='miss')
+        start = time.perf_counter()
+        chart = build()
+        built = time.perf_counter()
+        result = render_png(chart, rc) if backend == 'matplotlib' else render_vega_lite(chart)
+        CHART_BUILD_SECONDS.observe(built - start, backend=backend)
+        CHART_RENDER_SECONDS.observe(time.perf_counter() - built, backend=backend)
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return result
@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# 按年份/页码保存抓取断点，每页一个 json 文件，整年完成后写 done 标记
+class CrawlCheckpoint:
+    def __init__(self, root='crawl_state'):
+        self.root = root
+
+    def year_dir(self, year):
+        return os.path.join(self.root, str(year))
+
+    def page_path(self, year, page):
+        return os.path.join(self.year_dir(year), f'page_{page:04d}.json')
+
+    def has_page(self, year, page):
+        return os.path.exists(self.page_path(year, page))
+
+    def load_page(self, year, page):
+        path = self.page_path(year, page)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    # 先写临时文件再替换，避免中断时留下半个文件
+    def save_page(self, year, page, records):
+        os.makedirs(self.year_dir(year), exist_ok=True)
+        path = self.page_path(year, page)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def pages(self, year):
+        year_dir = self.year_dir(year)
+        if not os.path.isdir(year_dir):
+            return []
+        return sorted(int(m.group(1)) for m in
+                      (re.fullmatch(r'page_(\d+)\.json', name) for name in os.listdir(year_dir)) if m)
+
+    def load_year(self, year):
+        results = []
+        for page in self.pages(year):
+            results.extend(self.load_page(year, page))
+        return results
+
+    def is_year_done(self, year):
+        return os.path.exists(os.path.join(self.year_dir(year), 'done'))
+
+    def mark_year_done(self, year):
+        os.makedirs(self.year_dir(year), exist_ok=True)
+        with open(os.path.join(self.year_dir(year), 'done'), 'w', encoding='utf-8') as f:
+            f.write(str(len(self.pages(year))))
+
+    @property
+    def dead_letters(self):
+        return DeadLetterQueue(os.path.join(self.root, 'dead_letter.jsonl'))
+
+    # 最终失败（不可重试的 4xx）的详情页，只做记录，不再重抓
+    @property
+    def permanent_failures(self):
+        return DeadLetterQueue(os.path.join(self.root, 'permanent_failures.jsonl'))
+
+    def reset(self):
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+# 旧版断点直接存放在 state_dir 下（state_dir/<年份>/、dead_letter.jsonl），现在按数据集分目录（state_dir/<store 名>）
+# 新目录不存在时把旧断点移入，之前的抓取进度继续有效；返回是否迁移
+def migrate_legacy_checkpoint(state_dir, root):
+    if os.path.exists(root) or not os.path.isdir(state_dir):
+        return False
+    legacy = [name for name in os.listdir(state_dir)
+              if (name.isdigit() and os.path.isdir(os.path.join(state_dir, name))) or name == 'dead_letter.jsonl']
+    if not legacy:
+        return False
+    os.makedirs(root)
+    for name in legacy:
+        os.replace(os.path.join(state_dir, name), os.path.join(root, name))
+    return True
+
+# 死信队列：重试后仍失败的详情页，每行一条 json（年份、条目 id 与名称、URL、错误），之后用 --retry-dead-letters 定向重抓
+class DeadLetterQueue:
+    _locks = {}
+
+    def __init__(self, path):
+        self.path = path
+        # 同一文件的多个队列对象（各年份线程）共用一把锁
+        self.lock = DeadLetterQueue._locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def add(self, record):
+        record = {**record, 'time': time.time()}
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        with self.lock, open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # 重抓后只保留仍失败的记录
+    def replace(self, records):
+        with self.lock:
+            if not records:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,157 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+from charts import histogram_chart, line_chart
+from dashboard_data import (SectionTimer, load_dashboard_data, load_similarity_index, page_rows, show_chart,
+                            start_metrics_export)
+from locales import DEFAULT_LOCALE, LOCALES
+from stats_cube import ALL_TAGS
+
+# 看板主体：所有语言共用同一套分析逻辑，界面文字和标签对照来自语言包
+# locale 为 None 时由 URL 参数 ?lang= 或侧边栏选择语言，一个服务进程即可同时提供各语言版本
+def run(locale=None):
+    if locale is None:
+        locale = st.query_params.get('lang', DEFAULT_LOCALE)
+        if locale not in LOCALES:
+            locale = DEFAULT_LOCALE
+        pack = LOCALES[locale]
+        st.set_page_config(page_title=pack['page_title'], layout="wide")
+        names = list(LOCALES)
+        locale = st.sidebar.selectbox("Language", names, index=names.index(locale),
+                                      format_func=lambda name: LOCALES[name]['language'])
+        st.query_params['lang'] = locale
+    else:
+        st.set_page_config(page_title=LOCALES[locale]['page_title'], layout="wide")
+    pack = LOCALES[locale]
+    rc = {'font.sans-serif': pack['fonts'], 'axes.unicode_minus': False}
+    start_metrics_export()
+    timer = SectionTimer(locale)
+
+    # 数据、标签倒排索引和年份列表按数据文件签名缓存，所有会话、所有语言共享
+    data = load_dashboard_data()
+    timer.mark('load')
+    df = data.df
+    years = data.years
+    min_year, max_year = min(years), max(years)
+    year_range = st.sidebar.slider(
+        pack['year_select'],
+        min_value=min_year,
+        max_value=max_year,
+        value=(min_year, max_year),
+        step=1
+    )
+
+    # 展示名 -> 规范标签 ID，加载后每种语言只解析一次
+    topic_tags = data.locale_tags(locale, pack['topic_tags'], pack['tag_map'])
+    tag_name = st.sidebar.selectbox(pack['tag_select'], [pack['all']] + list(topic_tags))
+    tag = data.tag_vocab[topic_tags[tag_name]] if tag_name != pack['all'] else ALL_TAGS
+    backend = pack['backends'][st.sidebar.radio(pack['backend_select'], list(pack['backends']))]
+    # 图表缓存键：数据版本 + 语言 + 筛选状态
+    chart_key = (data.signature, locale, year_range, tag)
+
+    df_show = df[(df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
+    if tag != ALL_TAGS:
+        df_show = df_show[data.tag_index.mask(topic_tags[tag_name])[df_show.index.to_numpy()]]
+
+    st.write(pack['current_range'].format(year_range=year_range))
+    st.write(pack['year_distribution'])
+    st.write(df_show['year'].value_counts().sort_index())
+    timer.mark('filter')
+
+    st.write(pack['table_title'].format(start=year_range[0], end=year_range[1],
+                                        tag=' - ' + tag_name if tag != ALL_TAGS else ''))
+    # 表格只展示有排名的条目；排序和分页在服务端完成，只取出当前页的行
+    table_rows = df_show.index[df_show['rank'].notna()].to_numpy()
+    sort_options = pack['sort_options']
+    page_size = 50
+    n_pages = max(1, math.ceil(len(table_rows) / page_size))
+    sort_col, order_col, page_col = st.columns(3)
+    sort_label = sort_col.selectbox(pack['sort_select'], list(sort_options))
+    ascending = order_col.checkbox(pack['ascending'], value=sort_options[sort_label] == 'rank')
+    page = page_col.number_input(pack['page'], min_value=1, max_value=n_pages, value=1, step=1)
+    show_df = page_rows(df, table_rows, sort_options[sort_label], ascending, page, page_size, data.orders)
+
+    show_df = show_df.rename(columns={k: v for k, v in pack['columns'].items() if k in df.columns})
+    show_df = show_df.drop(columns=[c for c in ['type', 'type_unknown'] if c in show_df.columns])
+    st.dataframe(show_df)
+    st.caption(pack['caption'].format(total=len(table_rows), page=page, n_pages=n_pages))
+    timer.mark('table')
+
+    similar_panel(data, pack)
+    timer.mark('similar')
+
+    # 评分分布、趋势图的统计范围与表格一致，只统计有排名的条目
+    st.write(f"#### {pack['score_hist']}")
+    show_chart(chart_key + ('score_hist',),
+               lambda: histogram_chart(df['score'].iloc[table_rows], bins=20,
+                                       xlabel=pack['score'], ylabel=pack['count']),
+               backend, rc)
+    timer.mark('score_hist')
+
+    # 趋势直接从预聚合的 年份×类型×标签 统计立方体查询
+    cube = data.ranked_cube
+
+    def trend_chart():
+        title = pack['tag_trend'].format(tag=tag_name) if tag != ALL_TAGS else pack['trend']
+        return line_chart({pack['mean_score']: cube.trend(tag, years=year_range)},
+                          xlabel=pack['year'], ylabel=pack['mean_score'], title=title, legend=False)
+
+    def top_tags_trend_chart():
+        valid_top_tags = []
+        for t, tag_id in topic_tags.items():
+            year_counts = cube.query(tag=data.tag_vocab[tag_id], years=year_range)['count']
+            if (year_counts >= 10).sum() >= 10:
+                valid_top_tags.append(t)
+        top_tags = valid_top_tags[:10]
+
+        all_years = cube.query(years=year_range).index
+        series = {}
+        for t in top_tags:
+            trend = cube.trend(data.tag_vocab[topic_tags[t]], years=year_range)
+            if not trend.empty:
+                series[t] = trend.reindex(range(all_years.min(), all_years.max() + 1))
+        return line_chart(series, xlabel=pack['year'], ylabel=pack['mean_score'], title=pack['top_tags_trend'],
+                          legend_title=pack['tag_legend'], figsize=(12, 6))
+
+    st.write(f"#### {pack['trend']}")
+    if len(table_rows) > 0:
+        show_chart(chart_key + ('trend',), trend_chart, backend, rc)
+    timer.mark('trend')
+
+    if tag == ALL_TAGS:
+        st.write(f"#### {pack['top_tags_trend']}")
+        show_chart(chart_key + ('tag_trends',), top_tags_trend_chart, backend, rc)
+        timer.mark('top_tags_trend')
+
+    # 可扩展：国产/日本对比等分析
+
+# 相似作品：按名称搜索后选择一部作品，从预先计算的近邻索引中取出最相似的作品
+# 索引与看板数据逐行对应，按行号查询（同名作品不会混淆）；数据更新后索引未重建时视为缺失
+def similar_panel(data, pack, n=10):
+    st.write(f"#### {pack['similar_title']}")
+    index = load_similarity_index(data)
+    if index is None:
+        st.caption(pack['similar_missing'])
+        return
+    query = st.text_input(pack['similar_search'])
+    if not query:
+        return
+    df = data.df
+    hits = df['name'].str.contains(query, regex=False, na=False) | df['name_cn'].str.contains(query, regex=False, na=False)
+    matches = df.index[hits][:50]
+    if len(matches) == 0:
+        st.caption(pack['similar_no_match'])
+        return
+    choice = st.selectbox(pack['similar_select'], matches,
+                          format_func=lambda i: ' / '.join(str(v) for v in df.loc[i, ['name', 'name_cn']] if pd.notna(v))
+                          + (f" ({df.at[i, 'year']})" if pd.notna(df.at[i, 'year']) else ''))
+    rows, scores = index.neighbor_rows(df.index.get_loc(choice), n)
+    result = df.iloc[rows][['name', 'name_cn', 'score', 'year']].reset_index(drop=True)
+    result['similarity'] = scores
+    columns = {**pack['columns'], 'similarity': pack['similarity']}
+    st.dataframe(result.rename(columns=columns), hide_index=True)
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,180 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from charts import ChartCache
+from data_preprocess import extract_int
+from metrics import REGISTRY, JsonlReporter, serve
+from ranking import Ranking
+from similarity import SIMILAR_INDEX_DIR, SimilarityIndex
+from stats_cube import StatsCube
+from tag_index import TagIndex
+from tag_normalize import EncodedTags, normalize_tag
+
+DATA_FILE = 'bangumi_anime_2015_2024_cleaned.csv'
+SIGNATURE_KEY = b'bangumi_source_signature'
+# 快照内容的格式版本，build_frame 的处理逻辑变化时加一，使旧快照失效
+SNAPSHOT_VERSION = 5
+# 看板表格可排序的列
+SORT_COLUMNS = ['score', 'rank', 'score_count', 'weighted_score']
+
+SECTION_SECONDS = REGISTRY.histogram('dashboard_section_seconds', '看板各区块每次运行的耗时', ['locale', 'section'])
+
+# 数据文件签名（修改时间+大小），文件变化后缓存和快照自动失效
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, SNAPSHOT_VERSION]
+
+def snapshot_path(path):
+    return os.path.splitext(path)[0] + '_dashboard.parquet'
+
+def build_frame(path):
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    # 规范标签（别名合并、去除噪声、去重排序），与预处理的规则一致
+    df['tags'] = EncodedTags.from_tags(df['tags']).joined()
+    df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int64')
+    # "Rank 6388"、"(82人评分)" 在加载时一次性转为整数，渲染时不再逐行解析
+    for col in ['rank', 'score_count']:
+        df[col] = extract_int(df[col])
+    return df
+
+# 读取清洗好的二进制快照；快照不存在或与数据文件签名不符时重新解析 csv 并写入快照
+def load_frame(path=DATA_FILE):
+    signature = json.dumps(file_signature(path)).encode()
+    snapshot = snapshot_path(path)
+    if os.path.exists(snapshot):
+        metadata = pq.read_schema(snapshot).metadata or {}
+        if metadata.get(SIGNATURE_KEY) == signature:
+            return pd.read_parquet(snapshot)
+    df = build_frame(path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SIGNATURE_KEY: signature})
+    tmp_path = snapshot + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, snapshot)
+    return df
+
+# 看板共用的数据：清洗后的 DataFrame、标签倒排索引、年份列表、统计立方体
+# 所有会话共享同一份对象，调用方不要原地修改 df
+class DashboardData:
+    def __init__(self, df, signature=None):
+        self.df = df
+        # 数据版本，作为图表缓存键的一部分
+        self.signature = signature
+        self.tag_index = TagIndex.from_tags(df['tags'])
+        self.years = sorted([int(y) for y in df['year'].dropna().unique()])
+        # 规范标签 ID：数据中出现的标签按字典序编号，各语言的展示名在加载时解析到 ID
+        self.tag_vocab = self.tag_index.vocab
+        self.tag_ids = self.tag_index.ids
+        self._locale_tags = {}
+        # 看板表格只展示有排名的条目，趋势图的统计范围与之一致
+        self.ranked_cube = StatsCube.build(df, self.tag_index, row_mask=df['rank'].notna().to_numpy())
+        # 贝叶斯加权评分及全局/年份/类型/标签排名，加载时一次算好
+        self.ranking = Ranking.build(df, self.tag_index)
+        df['weighted_score'] = self.ranking.weighted
+        self.orders = sort_orders(df, SORT_COLUMNS)
+
+    # 语言包的展示标签 -> 规范标签 ID（按展示顺序，只保留数据中存在的标签），每种语言只解析一次
+    def locale_tags(self, locale, tags, tag_map=None):
+        if locale not in self._locale_tags:
+            tag_map = tag_map or {}
+            resolved = {}
+            for t in tags:
+                tag_id = self.tag_ids.get(normalize_tag(tag_map.get(t, t)))
+                if tag_id is not None:
+                    resolved[t] = tag_id
+            self._locale_tags[locale] = resolved
+        return self._locale_tags[locale]
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_dashboard_data(path, signature):
+    return DashboardData(load_frame(path), signature)
+
+def load_dashboard_data(path=DATA_FILE):
+    return _load_dashboard_data(path, tuple(file_signature(path)))
+
+# 相似索引以内存映射方式打开，按索引元数据文件签名缓存
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_similarity_index(path, signature):
+    return SimilarityIndex.load(path)
+
+# 索引与看板数据是否逐行对应：逐行比较名称，按 (索引签名, 数据签名) 只计算一次
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _similarity_aligned(path, index_signature, data_signature, _index, _data):
+    return _index.aligned_with(_data.df)
+
+# 与看板数据 data 逐行对应的相似索引；索引未构建或基于其他版本的数据时返回 None
+def load_similarity_index(data, path=SIMILAR_INDEX_DIR):
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    signature = tuple(file_signature(meta_path))
+    index = _load_similarity_index(path, signature)
+    return index if _similarity_aligned(path, signature, data.signature, index, data) else None
+
+# 指标导出每个服务进程只启动一次：环境变量 BANGUMI_METRICS_PORT 开启 Prometheus /metrics 端点，
+# BANGUMI_METRICS_JSONL 开启 JSONL 日志（间隔 BANGUMI_METRICS_INTERVAL 秒，默认 10）
+@st.cache_resource(show_spinner=False)
+def start_metrics_export():
+    port = os.environ.get('BANGUMI_METRICS_PORT')
+    path = os.environ.get('BANGUMI_METRICS_JSONL')
+    server = serve(int(port)) if port else None
+    reporter = JsonlReporter(path, float(os.environ.get('BANGUMI_METRICS_INTERVAL', 10))).start() if path else None
+    return server, reporter
+
+# 按页面顺序给各区块计时：每次 mark 记录距上一次 mark 的耗时
+class SectionTimer:
+    def __init__(self, locale):
+        self.locale = locale
+        self.last = time.perf_counter()
+
+    def mark(self, section):
+        now = time.perf_counter()
+        SECTION_SECONDS.observe(now - self.last, locale=self.locale, section=section)
+        self.last = now
+
+# 渲染好的图表（PNG 字节或 Vega-Lite 规格）在所有会话间共享
+@st.cache_resource(show_spinner=False)
+def chart_cache(max_entries=128):
+    return ChartCache(max_entries)
+
+# key 为筛选状态；缓存未命中时才调用 build 计算图表数据并渲染
+def show_chart(key, build, backend='matplotlib', rc=None):
+    result = chart_cache().get_or_render(key, build, backend, rc)
+    if backend == 'matplotlib':
+        st.image(result)
+    else:
+        st.vega_lite_chart(result, use_container_width=True)
+
+# 各排序列预先计算的升序/降序行号（空值排在最后，相同值保持原顺序），翻页时只需按筛选掩码过滤
+def sort_orders(df, columns):
+    orders = {}
+    for col in columns:
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(values))
+        missing = np.flatnonzero(np.isnan(values))
+        orders[col] = (np.concatenate([valid[np.argsort(values[valid], kind='stable')], missing]),
+                       np.concatenate([valid[np.argsort(-values[valid], kind='stable')], missing]))
+    return orders
+
+# 服务端分页：rows 为筛选后的行号，只取出当前页的行
+# 排序列有预计算顺序（orders）时按筛选掩码过滤该顺序，不再排序；否则只对排序列排序
+def page_rows(df, rows, sort_by=None, ascending=False, page=1, page_size=50, orders=None):
+    start = (page - 1) * page_size
+    if sort_by and orders and sort_by in orders:
+        mask = np.zeros(len(df), dtype=bool)
+        mask[rows] = True
+        order = orders[sort_by][0 if ascending else 1]
+        rows = order[mask[order]]
+    elif sort_by:
+        # 按位置排序：索引标签不一定等于行号，不能把 .index 传给 iloc
+        rows = np.asarray(rows)
+        keys = df[sort_by].iloc[rows].reset_index(drop=True)
+        rows = rows[keys.sort_values(ascending=ascending, na_position='last', kind='stable').index.to_numpy()]
+    return df.iloc[rows[start:start + page_size]]
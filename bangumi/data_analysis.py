@@ -1,51 +1,69 @@
+import argparse
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 
+from report_engine import Report, add_report_args, render_report, report_options
+from stats_cube import CUBE_FILE, StatsCube
+
 # 设置matplotlib支持中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'STSong', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
+RC = {'font.sans-serif': ['SimHei', 'STSong', 'Arial Unicode MS'], 'axes.unicode_minus': False}
 
-# 读取特征工程后的数据
-features_file = 'bangumi_anime_2015_2024_features.csv'
-df = pd.read_csv(features_file, encoding='utf-8-sig')
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
+HOT_TAGS = ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']
 
 # 1. 类型流行度随年份变化
-plt.figure(figsize=(14,7))
-type_year_count = df.groupby(['year', 'type'])['name'].count().unstack(fill_value=0)
-type_year_count.plot(kind='line', marker='o', ax=plt.gca())
-plt.title('2015-2024各类型番剧数量变化')
-plt.ylabel('数量')
-plt.xlabel('年份')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('type_year_trend.png')
-plt.show()
+def type_year_count(cube):
+    return cube.query(by=['year', 'type'])['count'].unstack(fill_value=0)
+
+def draw_type_year_trend(ax, type_year_count):
+    type_year_count.plot(kind='line', marker='o', ax=ax)
+    ax.set_title('2015-2024各类型番剧数量变化')
+    ax.set_ylabel('数量')
+    ax.set_xlabel('年份')
+    ax.grid(True)
 
 # 2. 标签流行趋势
-hot_tags = ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']
-for tag in hot_tags:
-    if tag not in df.columns:
-        df[tag] = 0
-plt.figure(figsize=(14,7))
-tag_year_count = df.groupby('year')[hot_tags].sum()
-tag_year_count.plot(kind='line', marker='o', ax=plt.gca())
-plt.title('热门标签随年份数量变化')
-plt.ylabel('数量')
-plt.xlabel('年份')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('tag_year_trend.png')
-plt.show()
+def tag_year_count(cube):
+    all_years = cube.query(by=['year']).index
+    counts = pd.DataFrame({tag: cube.query(by=['year'], tag=tag)['count'] for tag in HOT_TAGS})
+    return counts.reindex(all_years).fillna(0).astype(int)
+
+def draw_tag_year_trend(ax, tag_year_count):
+    tag_year_count.plot(kind='line', marker='o', ax=ax)
+    ax.set_title('热门标签随年份数量变化')
+    ax.set_ylabel('数量')
+    ax.set_xlabel('年份')
+    ax.grid(True)
 
 # 3. 评分分布
-plt.figure(figsize=(10,6))
-sns.histplot(df['score'], bins=30, kde=True)
-plt.title('番剧评分分布')
-plt.xlabel('评分')
-plt.ylabel('数量')
-plt.tight_layout()
-plt.savefig('score_distribution.png')
-plt.show()
-
-print('数据分析与可视化已完成，图表已保存。') 
\ No newline at end of file
+def draw_score_distribution(ax, df):
+    sns.histplot(df['score'], bins=30, kde=True, ax=ax)
+    ax.set_title('番剧评分分布')
+    ax.set_xlabel('评分')
+    ax.set_ylabel('数量')
+
+# 评分分布需要逐行数据，只读取评分列；按年份/类型/标签的统计从统计立方体查询
+def build_report(features_file=FEATURES_FILE, cube_file=CUBE_FILE):
+    report = Report(df=pd.read_parquet(features_file, columns=['score']), cube=StatsCube.load(cube_file))
+    report.aggregate('type_year_count', type_year_count, ['cube'])
+    report.aggregate('tag_year_count', tag_year_count, ['cube'])
+    report.chart('type_year_trend', draw_type_year_trend, ['type_year_count'], figsize=(14, 7))
+    report.chart('tag_year_trend', draw_tag_year_trend, ['tag_year_count'], figsize=(14, 7))
+    report.chart('score_distribution', draw_score_distribution, ['df'], figsize=(10, 6))
+    return report
+
+# 流水线阶段：特征表 + 统计立方体 -> 图表
+def run(features_file=FEATURES_FILE, cube_file=CUBE_FILE, out_dir='.', formats=('png',), workers=None, names=None):
+    results = render_report(build_report(features_file, cube_file), out_dir, formats, workers, names, RC)
+    print('数据分析与可视化已完成，图表已保存。')
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='数据分析与可视化')
+    add_report_args(parser)
+    args = parser.parse_args()
+    run(**report_options(args))
+
+if __name__ == '__main__':
+    main()
@@ -1,140 +1,226 @@
+import argparse
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import pyarrow.parquet as pq
 import seaborn as sns
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 
-plt.rcParams['font.sans-serif'] = ['SimHei', 'STSong', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
+from report_engine import Report, add_report_args, render_report, report_options
+from score_model import data_signature, load_model, save_model, train_model
+from stats_cube import CUBE_FILE, StatsCube
+from tag_clustering import (cluster_signature, fit_clusters, load_cluster_model, load_clusters, save_clusters,
+                            saved_signature, top_cluster_tags)
+from tag_matrix import load_display, load_tag_columns, load_tag_matrix, select_tags
 
-# 读取特征工程后的数据
-features_file = 'bangumi_anime_2015_2024_features.csv'
-df = pd.read_csv(features_file, encoding='utf-8-sig')
+RC = {'font.sans-serif': ['SimHei', 'STSong', 'Arial Unicode MS'], 'axes.unicode_minus': False}
 
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
 # 热门标签
-hot_tags = ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']
-for tag in hot_tags:
-    if tag not in df.columns:
-        df[tag] = 0
+HOT_TAGS = ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']
+# 产地标签
+REGION_TAGS = ['国产', '日本']
 
 # 1. 各类型每年平均评分
-plt.figure(figsize=(14,7))
-type_year_score = df.groupby(['year', 'type'])['score'].mean().unstack(fill_value=0)
-type_year_score.plot(kind='line', marker='o', ax=plt.gca())
-plt.title('2015-2024各类型番剧平均评分变化')
-plt.ylabel('平均评分')
-plt.xlabel('年份')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('type_year_score_trend.png')
-plt.show()
+def type_year_score(cube):
+    return cube.query(by=['year', 'type'])['mean'].unstack(fill_value=0)
+
+def draw_type_year_score_trend(ax, type_year_score):
+    type_year_score.plot(kind='line', marker='o', ax=ax)
+    ax.set_title('2015-2024各类型番剧平均评分变化')
+    ax.set_ylabel('平均评分')
+    ax.set_xlabel('年份')
+    ax.grid(True)
 
 # 2. 各标签每年平均评分
-plt.figure(figsize=(14,7))
-for tag in hot_tags:
-    df_tag = df[df[tag] == 1]
-    tag_score = df_tag.groupby('year')['score'].mean()
-    plt.plot(tag_score.index, tag_score.values, marker='o', label=tag)
-plt.title('热门标签番剧平均评分随年份变化')
-plt.xlabel('年份')
-plt.ylabel('平均评分')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('tag_year_score_trend.png')
-plt.show()
-
-# 3. 用户偏好聚类（KMeans）
-X = df[hot_tags].values
-kmeans = KMeans(n_clusters=4, random_state=42)
-df['cluster'] = kmeans.fit_predict(X)
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X)
-plt.figure(figsize=(10,7))
-sns.scatterplot(x=X_pca[:,0], y=X_pca[:,1], hue=df['cluster'], palette='Set2', alpha=0.6)
-plt.title('用户偏好聚类（热门标签）')
-plt.xlabel('PCA1')
-plt.ylabel('PCA2')
-plt.tight_layout()
-plt.savefig('user_preference_cluster.png')
-plt.show()
-
-# 4. 各聚类的标签偏好
-for i in range(4):
-    print(f'聚类{i}高频标签：')
-    print(df[df['cluster']==i][hot_tags].sum().sort_values(ascending=False))
-    print('-'*30)
-
-# 5. 高分番剧的类型/标签分布
-high_score_df = df[df['score'] >= 8]
-type_count = high_score_df['type'].value_counts()
-tag_count = high_score_df[hot_tags].sum().sort_values(ascending=False)
-print('高分番剧类型分布：')
-print(type_count)
-print('高分番剧热门标签分布：')
-print(tag_count)
+def tag_year_score(cube):
+    return {tag: cube.trend(tag) for tag in HOT_TAGS}
+
+def draw_tag_year_score_trend(ax, tag_year_score):
+    for tag, tag_score in tag_year_score.items():
+        ax.plot(tag_score.index, tag_score.values, marker='o', label=tag)
+    ax.set_title('热门标签番剧平均评分随年份变化')
+    ax.set_xlabel('年份')
+    ax.set_ylabel('平均评分')
+    ax.legend()
+    ax.grid(True)
+
+# 3. 用户偏好聚类（KMeans），返回每行的聚类编号和 PCA 二维坐标
+def clusters(df):
+    X = df[HOT_TAGS].values
+    kmeans = KMeans(n_clusters=4, random_state=42)
+    labels = kmeans.fit_predict(X)
+    X_pca = PCA(n_components=2).fit_transform(X)
+    return labels, X_pca
+
+# 3'. 基于完整稀疏标签矩阵的聚类：优先读取 tag_clustering.py 保存的结果，
+# 保存时的聚类数、行数、标签矩阵/词表哈希与当前不一致（或文件不存在）时重新拟合并保存
+def sparse_clusters(df, k=8):
+    matrix, vocab = select_tags(*load_tag_matrix())
+    signature = cluster_signature(matrix, vocab, k)
+    if saved_signature() == signature and signature['rows'] == len(df):
+        assignments = load_clusters()
+        return assignments['cluster'].to_numpy(), assignments[['svd_x', 'svd_y']].to_numpy()
+    result = fit_clusters(matrix, k=k)
+    save_clusters(result, vocab, df[['name', 'name_cn']], signature)
+    return result['labels'], result['embedding'][:, :2]
+
+def draw_user_preference_cluster(ax, clusters):
+    labels, X_pca = clusters
+    sns.scatterplot(x=X_pca[:, 0], y=X_pca[:, 1], hue=labels, palette='Set2', alpha=0.6, ax=ax)
+    ax.set_title('用户偏好聚类（热门标签）')
+    ax.set_xlabel('PCA1')
+    ax.set_ylabel('PCA2')
+
+def draw_tag_cluster(ax, clusters):
+    labels, coords = clusters
+    sns.scatterplot(x=coords[:, 0], y=coords[:, 1], hue=labels, palette='tab10', alpha=0.5, s=10, ax=ax)
+    ax.set_title('番剧标签聚类（全部标签）')
+    ax.set_xlabel('SVD1')
+    ax.set_ylabel('SVD2')
+
+# 5. 高分番剧
+def high_score_df(df):
+    return df[df['score'] >= 8]
 
 # 6. 高分番剧随年份变化
-high_score_year = high_score_df.groupby('year').size()
-plt.figure(figsize=(10,6))
-high_score_year.plot(kind='bar')
-plt.title('每年高分番剧数量')
-plt.xlabel('年份')
-plt.ylabel('数量')
-plt.tight_layout()
-plt.savefig('high_score_year.png')
-plt.show()
-
-# 7. 评分与标签/类型的相关性分析
-corr = df[hot_tags + ['score']].corr()['score'].sort_values(ascending=False)
-print('各标签与评分的相关性：')
-print(corr)
-
-# 8. 国产番剧与日本番剧差异分析
-china_df = df[df['tags'].apply(lambda x: '国产' in str(x))]
-japan_df = df[df['tags'].apply(lambda x: '日本' in str(x))]
-print(f'国产番剧数量: {len(china_df)}, 日本番剧数量: {len(japan_df)}')
-plt.figure(figsize=(10,6))
-sns.kdeplot(china_df['score'], label='国产', fill=True)
-sns.kdeplot(japan_df['score'], label='日本', fill=True)
-plt.title('国产番剧与日本番剧评分分布对比')
-plt.xlabel('评分')
-plt.ylabel('密度')
-plt.legend()
-plt.tight_layout()
-plt.savefig('china_japan_score_dist.png')
-plt.show()
-print('国产番剧热门标签：')
-print(china_df[hot_tags].sum().sort_values(ascending=False))
-print('日本番剧热门标签：')
-print(japan_df[hot_tags].sum().sort_values(ascending=False))
-
-# 9. 低分番剧共性分析
-low_score_df = df[df['score'] <= 6]
-print('低分番剧数量:', len(low_score_df))
-print('低分番剧热门标签：')
-print(low_score_df[hot_tags].sum().sort_values(ascending=False))
-print('低分番剧类型分布：')
-print(low_score_df['type'].value_counts())
-
-# 10. 机器学习模型预测高分番剧特征
-df['is_high_score'] = (df['score'] >= 8).astype(int)
-features = hot_tags + ['year_norm']
-X = df[features]
-y = df['is_high_score']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-clf = RandomForestClassifier(n_estimators=100, random_state=42)
-clf.fit(X_train, y_train)
-print('高分番剧预测准确率:', clf.score(X_test, y_test))
-importances = pd.Series(clf.feature_importances_, index=features).sort_values(ascending=False)
-print('特征重要性：')
-print(importances)
-importances.plot(kind='bar')
-plt.title('预测高分番剧的特征重要性')
-plt.tight_layout()
-plt.savefig('high_score_feature_importance.png')
-plt.show()
-
-print('深入数据分析与可视化已完成，图表已保存。') 
\ No newline at end of file
+def high_score_year(high_score_df):
+    return high_score_df.groupby('year').size()
+
+def draw_high_score_year(ax, high_score_year):
+    high_score_year.plot(kind='bar', ax=ax)
+    ax.set_title('每年高分番剧数量')
+    ax.set_xlabel('年份')
+    ax.set_ylabel('数量')
+
+# 8. 国产番剧与日本番剧：按规范标签精确匹配（标签列来自稀疏矩阵）
+def china_df(df):
+    return df[df['国产'] == 1]
+
+def japan_df(df):
+    return df[df['日本'] == 1]
+
+def draw_china_japan_score_dist(ax, china_scores, japan_scores):
+    sns.kdeplot(china_scores, label='国产', fill=True, ax=ax)
+    sns.kdeplot(japan_scores, label='日本', fill=True, ax=ax)
+    ax.set_title('国产番剧与日本番剧评分分布对比')
+    ax.set_xlabel('评分')
+    ax.set_ylabel('密度')
+    ax.legend()
+
+# 10. 高分番剧预测模型（标签稀疏矩阵 + 类型 + 年份），返回 (测试集准确率, 特征重要性)
+# 优先使用 score_model.py 保存的最新模型；没有模型或模型的训练数据签名与当前数据不符时训练并保存新版本
+def feature_importance(df, top_k=500):
+    matrix, vocab = load_tag_matrix()
+    model = load_model()
+    if model is None or model.meta.get('data_signature') != data_signature(matrix, vocab, top_k):
+        model = train_model(df, matrix, vocab, top_k=top_k)
+        save_model(model)
+    return model.meta['accuracy'], model.importances(display=load_display())
+
+def draw_high_score_feature_importance(ax, feature_importance):
+    feature_importance[1].plot(kind='bar', ax=ax)
+    ax.set_title('预测高分番剧的特征重要性')
+
+# 读取特征工程后的数据，只从稀疏标签矩阵中取出需要的标签列；按年份/类型/标签的评分统计直接从统计立方体查询
+# cluster_mode：hot 只用热门标签做 KMeans；sparse 使用完整稀疏标签矩阵（MiniBatchKMeans + TruncatedSVD）
+def build_report(features_file=FEATURES_FILE, cube_file=CUBE_FILE, cluster_mode='hot', k=8):
+    df = pq.read_table(features_file).drop_columns(['tag_ids']).to_pandas()
+    df = pd.concat([df, load_tag_columns(HOT_TAGS + REGION_TAGS)], axis=1)
+    report = Report(df=df, cube=StatsCube.load(cube_file), cluster_mode=cluster_mode)
+    report.aggregate('type_year_score', type_year_score, ['cube'])
+    report.aggregate('tag_year_score', tag_year_score, ['cube'])
+    if cluster_mode == 'sparse':
+        report.aggregate('clusters', lambda d: sparse_clusters(d, k), ['df'])
+    else:
+        report.aggregate('clusters', clusters, ['df'])
+    report.aggregate('high_score_df', high_score_df, ['df'])
+    report.aggregate('high_score_year', high_score_year, ['high_score_df'])
+    report.aggregate('china_df', china_df, ['df'])
+    report.aggregate('japan_df', japan_df, ['df'])
+    report.aggregate('china_scores', lambda d: d['score'], ['china_df'])
+    report.aggregate('japan_scores', lambda d: d['score'], ['japan_df'])
+    report.aggregate('feature_importance', feature_importance, ['df'])
+
+    report.chart('type_year_score_trend', draw_type_year_score_trend, ['type_year_score'], figsize=(14, 7))
+    report.chart('tag_year_score_trend', draw_tag_year_score_trend, ['tag_year_score'], figsize=(14, 7))
+    if cluster_mode == 'sparse':
+        report.chart('tag_cluster', draw_tag_cluster, ['clusters'], figsize=(10, 7))
+    else:
+        report.chart('user_preference_cluster', draw_user_preference_cluster, ['clusters'], figsize=(10, 7))
+    report.chart('high_score_year', draw_high_score_year, ['high_score_year'], figsize=(10, 6))
+    report.chart('china_japan_score_dist', draw_china_japan_score_dist, ['china_scores', 'japan_scores'],
+                 figsize=(10, 6))
+    report.chart('high_score_feature_importance', draw_high_score_feature_importance, ['feature_importance'],
+                 figsize=(12, 6))
+    return report
+
+# 文字结论，使用与图表相同的共享聚合结果
+def print_findings(report):
+    df = report.get('df')
+
+    # 4. 各聚类的标签偏好
+    labels, _ = report.get('clusters')
+    for i in np.unique(labels):
+        print(f'聚类{i}高频标签：')
+        print(df[labels == i][HOT_TAGS].sum().sort_values(ascending=False))
+        print('-'*30)
+    if report.get('cluster_mode') == 'sparse':
+        for i, tags in enumerate(top_cluster_tags(load_cluster_model(), display=load_display())):
+            print(f'聚类{i}全部标签中占比最高：' + '、'.join(f'{t} {s:.0%}' for t, s in tags))
+
+    # 5. 高分番剧的类型/标签分布
+    high = report.get('high_score_df')
+    print('高分番剧类型分布：')
+    print(high['type'].value_counts())
+    print('高分番剧热门标签分布：')
+    print(high[HOT_TAGS].sum().sort_values(ascending=False))
+
+    # 7. 评分与标签/类型的相关性分析
+    corr = df[HOT_TAGS + ['score']].corr()['score'].sort_values(ascending=False)
+    print('各标签与评分的相关性：')
+    print(corr)
+
+    # 8. 国产番剧与日本番剧差异分析
+    china, japan = report.get('china_df'), report.get('japan_df')
+    print(f'国产番剧数量: {len(china)}, 日本番剧数量: {len(japan)}')
+    print('国产番剧热门标签：')
+    print(china[HOT_TAGS].sum().sort_values(ascending=False))
+    print('日本番剧热门标签：')
+    print(japan[HOT_TAGS].sum().sort_values(ascending=False))
+
+    # 9. 低分番剧共性分析
+    low_score_df = df[df['score'] <= 6]
+    print('低分番剧数量:', len(low_score_df))
+    print('低分番剧热门标签：')
+    print(low_score_df[HOT_TAGS].sum().sort_values(ascending=False))
+    print('低分番剧类型分布：')
+    print(low_score_df['type'].value_counts())
+
+    # 10. 机器学习模型预测高分番剧特征
+    accuracy, importances = report.get('feature_importance')
+    print('高分番剧预测准确率:', accuracy)
+    print('特征重要性：')
+    print(importances)
+
+# 流水线阶段：特征表 + 统计立方体 + 标签矩阵 -> 图表和文字结论
+def run(features_file=FEATURES_FILE, cube_file=CUBE_FILE, cluster_mode='hot', k=8,
+        out_dir='.', formats=('png',), workers=None, names=None):
+    report = build_report(features_file, cube_file, cluster_mode, k)
+    results = render_report(report, out_dir, formats, workers, names, RC)
+    print_findings(report)
+    print('深入数据分析与可视化已完成，图表已保存。')
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='深入数据分析与可视化')
+    parser.add_argument('--cluster-mode', choices=['hot', 'sparse'], default='hot',
+                        help='hot：热门标签 KMeans；sparse：全部标签的稀疏矩阵聚类')
+    parser.add_argument('--k', type=int, default=8, help='sparse 模式的聚类数（已有聚类结果时直接复用）')
+    add_report_args(parser)
+    args = parser.parse_args()
+    run(cluster_mode=args.cluster_mode, k=args.k, **report_options(args))
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,112 @@
+import os
 import pandas as pd
-import re
-
-# 1. 读取修复后的标准csv
-raw_file = 'bangumi_anime_2015_2024.csv'
-col_names = ['name', 'name_cn', 'info', 'score', 'score_count', 'rank', 'type', 'tags']
-df = pd.read_csv(raw_file, encoding='utf-8-sig', names=col_names, header=0)
-print('实际列名:', df.columns)
-print(df.head())
-
-# 2. 提取年份
-def extract_year(info):
-    match = re.search(r'(20\d{2})', str(info))
-    return int(match.group(1)) if match else None
-
-df['year'] = df['info'].apply(extract_year)
-
-# 调试：打印无法提取年份的info内容
-print('无法提取年份的info样例:')
-print(df[df['year'].isna()]['info'].head(20))
-
-# 3. 强制转换score为数值型，无法转换的设为NaN
-score_numeric = pd.to_numeric(df['score'], errors='coerce')
-mask = score_numeric.isna() & df['score'].notna()
-print('无法转换为数字的score内容:')
-print(df.loc[mask, 'score'].unique())
-df['score'] = score_numeric
-
-# 4. 去除无年份或无评分的行
-df = df.dropna(subset=['year', 'score'])
-
-# 5. 填充空标签
-df['tags'] = df['tags'].fillna('')
-
-# 6. 标签拆分
-df['tags_list'] = df['tags'].apply(lambda x: x.split(',') if x else [])
-
-# 7. 类型one-hot编码
-df['type'] = df['type'].fillna('unknown')
-type_dummies = pd.get_dummies(df['type'], prefix='type')
-df = pd.concat([df, type_dummies], axis=1)
-
-# 8. 保存清洗后数据
-cleaned_file = 'bangumi_anime_2015_2024_cleaned.csv'
-df.to_csv(cleaned_file, index=False, encoding='utf-8-sig')
-print(f'预处理后的数据已保存为 {cleaned_file}')
-
-# 9. 检查结果
-print(df.head())
-print(df.info())
-print(df['year'].value_counts().sort_index()) 
\ No newline at end of file
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tag_normalize import EncodedTags, with_vocab
+
+RAW_STORE = 'bangumi_anime_store'
+RAW_FILE = 'bangumi_anime_2015_2024.csv'
+CLEANED_FILE = 'bangumi_anime_2015_2024_cleaned.csv'
+# 下游流水线读取的类型化数据，标签以 tag_ids（list<int32>）存储，词表在 schema 元数据中
+CLEANED_PARQUET = 'bangumi_anime_2015_2024_cleaned.parquet'
+# subject_id 为条目唯一键（旧版爬虫输出没有该列，读取时为空）
+COL_NAMES = ['name', 'name_cn', 'info', 'score', 'score_count', 'rank', 'type', 'tags', 'subject_id']
+
+YEAR_PATTERN = r'(20\d{2})'
+# 首播日期：2015-06-02 / 2015年7月3日 / 2015年7月 等
+DATE_PATTERN = r'((?:19|20)\d{2})\s*[-年/.]\s*(\d{1,2})(?:\s*[-月/.]\s*(\d{1,2}))?'
+EPISODE_PATTERN = r'(\d+)\s*话'
+NUMBER_PATTERN = r'(\d+)'
+
+# 1. 读取原始数据：优先读取爬虫输出的分区列式存储，否则读取标准csv
+def load_raw(raw_store=RAW_STORE, raw_file=RAW_FILE):
+    if os.path.isdir(raw_store):
+        from dataset_store import read_dataset
+        df = read_dataset(raw_store, columns=COL_NAMES)
+        # 与读取csv时一致：空字符串视为缺失
+        return df.mask(df == '')
+    return read_raw_csv(raw_file)
+
+# 爬虫导出的 csv，按 COL_NAMES 取列，缺少的列补空
+def read_raw_csv(path):
+    return pd.read_csv(path, encoding='utf-8-sig', dtype={'subject_id': str}).reindex(columns=COL_NAMES)
+
+# 2. 从 info 中向量化提取年份、首播日期和集数
+def extract_info_fields(info):
+    info = info.astype('string')
+    year = pd.to_numeric(info.str.extract(YEAR_PATTERN, expand=False), errors='coerce').astype('Int16')
+    date_parts = info.str.extract(DATE_PATTERN).apply(pd.to_numeric, errors='coerce')
+    # 只有年月时按当月1日计；拼成 YYYYMMDD 整数后一次性解析，非法日期为 NaT
+    date_num = date_parts[0] * 10000 + date_parts[1] * 100 + date_parts[2].fillna(1)
+    air_date = pd.to_datetime(date_num.astype('Int64').astype('string'), format='%Y%m%d', errors='coerce')
+    episodes = pd.to_numeric(info.str.extract(EPISODE_PATTERN, expand=False), errors='coerce').astype('Int32')
+    return year, air_date, episodes
+
+# 从 "(82人评分)"、"Rank 6388" 这类文本中提取整数
+def extract_int(s):
+    return pd.to_numeric(s.astype('string').str.extract(NUMBER_PATTERN, expand=False), errors='coerce').astype('Int32')
+
+# 返回清洗后的 DataFrame 和字典编码后的标签（与 DataFrame 逐行对应）
+def preprocess(df, verbose=True):
+    df['year'], df['air_date'], df['episodes'] = extract_info_fields(df['info'])
+
+    if verbose:
+        # 调试：打印无法提取年份的info内容
+        print('无法提取年份的info样例:')
+        print(df[df['year'].isna()]['info'].head(20))
+
+    # 3. 强制转换score为数值型，无法转换的设为NaN
+    score_numeric = pd.to_numeric(df['score'], errors='coerce').astype('float32')
+    if verbose:
+        mask = score_numeric.isna() & df['score'].notna()
+        print('无法转换为数字的score内容:')
+        print(df.loc[mask, 'score'].unique())
+    df['score'] = score_numeric
+    df['score_count'] = extract_int(df['score_count'])
+    df['rank'] = extract_int(df['rank'])
+    df['subject_id'] = pd.to_numeric(df['subject_id'], errors='coerce').astype('Int64')
+
+    # 4. 去除无年份或无评分的行
+    df = df.dropna(subset=['year', 'score']).reset_index(drop=True)
+
+    # 5. 标签规范化（别名合并、去除年份/季度等噪声、去重排序），空标签为空串；tags 列保存各标签的展示写法
+    # 6. 标签字典编码为整数 ID，下游的矩阵、索引和筛选只使用 ID
+    tags = EncodedTags.from_tags(df['tags'])
+    df['tags'] = tags.joined()
+    if verbose:
+        print(f'规范化后标签词表: {len(tags.vocab)} 个')
+
+    # 7. 类型one-hot编码
+    df['type'] = df['type'].fillna('unknown').astype('category')
+    type_dummies = pd.get_dummies(df['type'], prefix='type')
+    return pd.concat([df, type_dummies], axis=1), tags
+
+# 流水线阶段：原始数据 -> 清洗后的 csv 和 parquet
+def run(raw_store=RAW_STORE, raw_file=RAW_FILE, cleaned_file=CLEANED_FILE, cleaned_parquet=CLEANED_PARQUET,
+        verbose=True):
+    df = load_raw(raw_store, raw_file)
+    if verbose:
+        print('实际列名:', df.columns)
+        print(df.head())
+
+    df, tags = preprocess(df, verbose)
+
+    # 8. 保存清洗后数据（csv 供表格查看和旧版读取，parquet 供下游流水线）
+    df.to_csv(cleaned_file, index=False, encoding='utf-8-sig')
+    table = pa.Table.from_pandas(df, preserve_index=False).append_column('tag_ids', tags.to_arrow())
+    pq.write_table(with_vocab(table, tags.vocab, tags.display), cleaned_parquet)
+    print(f'预处理后的数据已保存为 {cleaned_file}, {cleaned_parquet}')
+
+    # 9. 检查结果
+    if verbose:
+        print(df.head())
+        df.info(memory_usage='deep')
+        print(df['year'].value_counts().sort_index())
+    return df
+
+def main():
+    run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITION = 'crawl_year'
+
+# 按抓取年份分区的列式存储：root/crawl_year=YYYY/page-NNNN.parquet
+# 每个列表页写一个文件，只追加不修改；同一页重写时覆盖同名文件，保证断点续抓不会重复
+class DatasetWriter:
+    def __init__(self, root, columns):
+        self.root = root
+        self.columns = columns
+        self.schema = pa.schema([(c, pa.string()) for c in columns])
+
+    def partition_dir(self, year):
+        return os.path.join(self.root, f'{PARTITION}={year}')
+
+    def write_page(self, year, page, records):
+        table = pa.Table.from_pylist(
+            [{c: r.get(c, '') for c in self.columns} for r in records], schema=self.schema
+        )
+        self.write_table(year, f'page-{page:04d}.parquet', table)
+
+    def write_table(self, year, filename, table):
+        os.makedirs(self.partition_dir(year), exist_ok=True)
+        path = os.path.join(self.partition_dir(year), filename)
+        tmp_path = path + '.tmp'
+        pq.write_table(table.cast(self.schema), tmp_path)
+        os.replace(tmp_path, path)
+
+    # 死信重抓后回填：按 subject id 改写某一列，values 为 {subject_id: 新值}
+    # 只重写包含这些行的文件（没有 subject_id 列的旧文件无法定位条目，跳过），返回改写的行数
+    def update_column(self, year, column, values):
+        count = 0
+        for path in partition_files(self.root, year):
+            table = pq.read_table(path)
+            if 'subject_id' not in table.column_names:
+                continue
+            keys = table.column('subject_id').to_pylist()
+            hits = [i for i, key in enumerate(keys) if key in values]
+            if not hits:
+                continue
+            current = table.column(column).to_pylist()
+            for i in hits:
+                current[i] = values[keys[i]]
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, pa.array(current, pa.string()))
+            self.write_table(year, os.path.basename(path), table)
+            count += len(hits)
+        return count
+
+    def clear_year(self, year):
+        if os.path.isdir(self.partition_dir(year)):
+            shutil.rmtree(self.partition_dir(year))
+
+def partition_years(root):
+    if not os.path.isdir(root):
+        return []
+    prefix = f'{PARTITION}='
+    return sorted(int(name[len(prefix):]) for name in os.listdir(root) if name.startswith(prefix))
+
+def partition_files(root, year):
+    year_dir = os.path.join(root, f'{PARTITION}={year}')
+    if not os.path.isdir(year_dir):
+        return []
+    return sorted(os.path.join(year_dir, name) for name in os.listdir(year_dir) if name.endswith('.parquet'))
+
+# columns 给定时按固定 schema 读取：旧文件缺少的列（如后来新增的 subject_id）读为空值
+def open_dataset(root, columns=None):
+    schema = None
+    if columns is not None:
+        schema = pa.schema([(c, pa.string()) for c in columns] + [(PARTITION, pa.int32())])
+    return ds.dataset(root, format='parquet', partitioning='hive', schema=schema)
+
+def _year_filter(years):
+    return ds.field(PARTITION).isin(list(years)) if years is not None else None
+
+# 只读取需要的分区和列
+def read_dataset(root, years=None, columns=None):
+    table = open_dataset(root, columns).to_table(columns=columns, filter=_year_filter(years))
+    return table.to_pandas()
+
+# 流式导出 CSV，按批读取，内存占用与数据量无关
+def export_csv(root, path, columns, years=None):
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        header = True
+        fragments = open_dataset(root, columns).get_fragments(filter=_year_filter(years))
+        for fragment in sorted(fragments, key=lambda frag: frag.path):
+            for batch in fragment.to_batches(columns=columns):
+                batch.to_pandas().to_csv(f, index=False, header=header)
+                header = False
+                count += batch.num_rows
+        if header:
+            f.write(','.join(columns) + '\n')
+    return count
+
+# 按 subject id 改写已有 CSV 中的某一列，values 为 {subject_id: 新值}，其余行和列原样保留；返回改写的行数
+# 没有 subject_id 列的旧版 CSV 无法定位条目，不做改动
+def patch_csv(path, column, values):
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    if 'subject_id' not in df.columns or not values:
+        return 0
+    hits = df['subject_id'].isin(values.keys())
+    if not hits.any():
+        return 0
+    df.loc[hits, column] = df.loc[hits, 'subject_id'].map(values)
+    tmp_path = path + '.tmp'
+    df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+    return int(hits.sum())
+
+# 合并多个分片的输出：按年份逐个分区处理，分片按给定顺序、文件按页码顺序读取，结果与分片完成的先后无关
+# 以 subject_id 去重保留第一次出现的行（同一条目只属于一个放送年份，正常情况下分片之间没有重复）；
+# 名称相同的不同条目 id 不同，都会保留；没有 id 的行（旧数据）原样保留
+def merge_shards(shard_roots, out_root, columns):
+    writer = DatasetWriter(out_root, columns)
+    seen = set()
+    total = 0
+    years = sorted(set(y for root in shard_roots for y in partition_years(root)))
+    for year in years:
+        paths = [path for root in shard_roots for path in partition_files(root, year)]
+        if not paths:
+            continue
+        df = open_dataset(paths, columns).to_table(columns=columns).to_pandas()
+        ids = df['subject_id'].fillna('')
+        keep = (ids == '') | (~ids.duplicated() & ~ids.isin(seen))
+        seen.update(ids[keep & (ids != '')])
+        writer.clear_year(year)
+        writer.write_table(year, 'part-0000.parquet',
+                           pa.Table.from_pandas(df[keep], preserve_index=False))
+        total += int(keep.sum())
+    return total
@@ -1,24 +1,15 @@
-import pandas as pd
-from sklearn.preprocessing import MultiLabelBinarizer, MinMaxScaler
-import ast
-
-# 1. 读取清洗后数据
-df = pd.read_csv('bangumi_anime_2015_2024_cleaned.csv', encoding='utf-8-sig')
-
-# 2. 标签多热编码（确保tags_list为列表类型）
-def safe_eval(val):
-    if isinstance(val, list):
-        return val
-    try:
-        return ast.literal_eval(val)
-    except Exception:
-        return []
-
-df['tags_list'] = df['tags_list'].apply(safe_eval)
-mlb = MultiLabelBinarizer()
-tags_encoded = mlb.fit_transform(df['tags_list'])
-tags_df = pd.DataFrame(tags_encoded, columns=mlb.classes_)
-df = pd.concat([df, tags_df], axis=1)
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.preprocessing import MinMaxScaler
+
+from stats_cube import CUBE_FILE, StatsCube
+from tag_index import TagIndex
+from tag_matrix import TAG_MATRIX_FILE, TAG_VOCAB_FILE, build_tag_matrix, load_tag_columns, save_tag_matrix
+from tag_normalize import EncodedTags, with_vocab
+
+CLEANED_PARQUET = 'bangumi_anime_2015_2024_cleaned.parquet'
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
 
 # 3. 评分离散化（高分/中分/低分）
 def score_level(score):
@@ -29,17 +20,54 @@ def score_level(score):
     else:
         return '低分'
 
-df['score_level'] = df['score'].apply(score_level)
+# table 为清洗后数据的 Arrow 表；标签直接使用预处理时字典编码的 tag_ids，不再拆分字符串
+def build_features(table, min_freq=1, top_k=None):
+    tags = EncodedTags.from_table(table)
+    # 2. 标签多热编码，单独保存为稀疏矩阵，不再拼接到特征表中
+    tag_matrix = build_tag_matrix(tags, min_freq=min_freq, top_k=top_k)
+
+    df = table.drop_columns(['tag_ids']).to_pandas()
+    df['score_level'] = df['score'].apply(score_level)
+
+    # 4. 年份归一化
+    year_scaler = MinMaxScaler()
+    df['year_norm'] = year_scaler.fit_transform(df[['year']])
+
+    # 年份×类型×标签 评分统计立方体，供分析脚本直接查询趋势
+    cube = StatsCube.build(df, TagIndex.from_encoded(tags))
+
+    features = pa.Table.from_pandas(df, preserve_index=False).append_column('tag_ids', tags.to_arrow())
+    features = with_vocab(features, tags.vocab, tags.display)
+    return features, tag_matrix, cube, dict(zip(tags.vocab, tags.display))
+
+# 流水线阶段：清洗后的 parquet -> 特征表、标签稀疏矩阵和词表、统计立方体
+def run(cleaned_parquet=CLEANED_PARQUET, features_file=FEATURES_FILE, matrix_path=TAG_MATRIX_FILE,
+        vocab_path=TAG_VOCAB_FILE, cube_file=CUBE_FILE, min_freq=1, top_k=None, verbose=True):
+    # 1. 读取清洗后数据
+    table = pq.read_table(cleaned_parquet)
+    features, (matrix, vocab, freq), cube, display = build_features(table, min_freq=min_freq, top_k=top_k)
+
+    # 5. 保存特征工程后数据
+    pq.write_table(features, features_file)
+    save_tag_matrix(matrix, vocab, freq, matrix_path, vocab_path, display)
+    cube.save(cube_file)
+    print(f'特征工程后的数据已保存为 {features_file}')
+    print(f'标签稀疏矩阵 {matrix.shape} 已保存为 {matrix_path}, 词表: {vocab_path}')
+    print(f'统计立方体 {len(cube.frame)} 格已保存为 {cube_file}')
 
-# 4. 年份归一化
-year_scaler = MinMaxScaler()
-df['year_norm'] = year_scaler.fit_transform(df[['year']])
+    # 6. 检查特征
+    if verbose:
+        print(features.slice(0, 5).to_pandas())
+        hot_tags = ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']
+        print([tag for tag in hot_tags if tag in vocab])
+        print(load_tag_columns(hot_tags, matrix_path, vocab_path).sum())
 
-# 5. 保存特征工程后数据
-df.to_csv('bangumi_anime_2015_2024_features.csv', index=False, encoding='utf-8-sig')
-print('特征工程后的数据已保存为 bangumi_anime_2015_2024_features.csv')
+def main():
+    parser = argparse.ArgumentParser(description='特征工程')
+    parser.add_argument('--min-freq', type=int, default=1, help='标签最少出现次数')
+    parser.add_argument('--top-k', type=int, help='只保留出现最多的前 K 个标签')
+    args = parser.parse_args()
+    run(min_freq=args.min_freq, top_k=args.top_k)
 
-# 6. 检查特征
-print(df.head())
-print([col for col in df.columns if col in ['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']])
-print(df[['百合', '热血', '奇幻', '科幻', '恋爱', '战斗']].sum()) 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import REGISTRY
+from retry_policy import RETRIES, RETRY_STATUSES, CircuitBreaker, RetryPolicy, parse_retry_after
+
+HEADERS = {
+    "User-Agent": "zemi/bangumi-research/0.1 (https://github.com/zemi/bangumi-research)"
+}
+
+REQUEST_SECONDS = REGISTRY.histogram('crawler_request_seconds', 'HTTP 请求耗时（不含限速等待）', ['host', 'status'])
+RESPONSE_BYTES = REGISTRY.counter('crawler_response_bytes', '下载的响应体字节数', ['host'])
+REQUEST_ERRORS = REGISTRY.counter('crawler_request_errors', '请求异常（超时、连接错误等）', ['host', 'error'])
+RATE_WAIT_SECONDS = REGISTRY.histogram('crawler_rate_limit_wait_seconds', '请求在令牌桶上的等待时间', ['limiter'])
+CACHE_REQUESTS = REGISTRY.counter('crawler_cache_requests', '页面缓存结果：hit/revalidated/miss', ['result'])
+
+# 非 200 响应（重试后仍失败）
+class FetchError(Exception):
+    def __init__(self, url, status):
+        super().__init__(f'HTTP {status}: {url}')
+        self.url = url
+        self.status = status
+
+    # 不可重试的 4xx（如 404 条目已删除）：重抓也不会成功，应记为最终失败而不是进死信队列
+    @property
+    def permanent(self):
+        return 400 <= self.status < 500 and self.status not in RETRY_STATUSES
+
+# 令牌桶限速：rate 为每秒允许的请求数，burst 为允许的突发请求数
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # 返回本次等待的秒数
+    def acquire(self):
+        if self.rate <= 0:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    # 调整速率前先按旧速率累计令牌
+    def set_rate(self, rate):
+        with self.lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = float(rate)
+
+# 共享连接池的 HTTP 客户端，按全局和单域名两级限速
+# 超时、连接错误和可重试状态码按 retry 策略退避重试，错误率升高时由熔断器暂停并降低全局限速
+class HttpClient:
+    def __init__(self, global_rate=16, host_rate=8, burst=4, pool_size=32, timeout=10, cache=None,
+                 retry=None, breaker=None):
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = timeout
+        self.cache = cache
+        self.host_rate = host_rate
+        self.burst = burst
+        self.global_limiter = RateLimiter(global_rate, burst)
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(self.global_limiter)
+        self.host_limiters = {}
+        self.lock = threading.Lock()
+
+    def _host_limiter(self, host):
+        with self.lock:
+            limiter = self.host_limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(self.host_rate, self.burst)
+                self.host_limiters[host] = limiter
+            return limiter
+
+    # 限速等待、请求耗时、字节数和异常分别计入指标，用于区分抓取慢在限速还是网络
+    # 重试次数用完后：异常原样抛出，可重试状态码返回最后一次响应
+    def get(self, url, **kwargs):
+        host = urlsplit(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            self.breaker.wait()
+            RATE_WAIT_SECONDS.observe(self.global_limiter.acquire(), limiter='global')
+            RATE_WAIT_SECONDS.observe(self._host_limiter(host).acquire(), limiter='host')
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, **kwargs)
+            except requests.RequestException as e:
+                REQUEST_ERRORS.inc(host=host, error=type(e).__name__)
+                self.breaker.record(False)
+                delay = self.retry.next_delay(attempt)
+                if delay is None:
+                    raise
+                reason = type(e).__name__
+            else:
+                REQUEST_SECONDS.observe(time.perf_counter() - start, host=host, status=resp.status_code)
+                RESPONSE_BYTES.inc(len(resp.content), host=host)
+                if not self.retry.should_retry(resp.status_code):
+                    self.breaker.record(True)
+                    return resp
+                retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                # 429 是服务端要求整体降速，熔断器暂停所有线程；其他状态码只影响错误率
+                self.breaker.record(False, retry_after if resp.status_code == 429 else None)
+                delay = self.retry.next_delay(attempt, retry_after)
+                if delay is None:
+                    return resp
+                reason = str(resp.status_code)
+            RETRIES.inc(reason=reason)
+            time.sleep(delay)
+            attempt += 1
+
+    # 返回 (状态码, 文本)；有缓存时在 TTL 内直接命中，过期后用 ETag/Last-Modified 做条件请求
+    # ttl 可覆盖缓存的默认有效期，ttl=0 表示总是重新验证
+    def get_text(self, url, encoding=None, ttl=None):
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry, ttl):
+            CACHE_REQUESTS.inc(result='hit')
+            return entry['status'], entry['body']
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        resp = self.get(url, headers=headers)
+        if resp.status_code == 304 and entry:
+            CACHE_REQUESTS.inc(result='revalidated')
+            self.cache.touch(url)
+            return entry['status'], entry['body']
+        if self.cache:
+            CACHE_REQUESTS.inc(result='miss')
+        resp.encoding = encoding or resp.apparent_encoding
+        text = resp.text
+        if self.cache and resp.status_code == 200:
+            self.cache.put(url, resp.status_code, text,
+                           resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+        return resp.status_code, text
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
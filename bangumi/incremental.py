@@ -0,0 +1,74 @@
+from collections import Counter
+
+import pandas as pd
+
+COMPARE_FIELDS = ['score', 'score_count', 'rank']
+
+def _as_str(value):
+    return '' if pd.isna(value) else str(value).strip()
+
+# 条目唯一键：subject id（不同条目可能同名）；旧版数据没有 id 时为空串
+def row_key(row):
+    return _as_str(row.get('subject_id'))
+
+# 原名+中文名，只用于匹配没有 subject id 的旧版数据
+def name_key(row):
+    return f"{_as_str(row.get('name'))}\t{_as_str(row.get('name_cn'))}"
+
+# 读取上一次的数据集，返回 (DataFrame, 索引)；索引以 ('id', subject id) 为键，
+# 没有 id 的旧行以 ('name', 名称) 为键，且只收录名称唯一的行（同名的多行无法区分，不复用其标签）
+def load_previous(path, columns):
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    df = df.reindex(columns=columns, fill_value='')
+    records = df.to_dict('records')
+    index = {('id', row_key(row)): row for row in records if row_key(row)}
+    legacy = [row for row in records if not row_key(row)]
+    counts = Counter(name_key(row) for row in legacy)
+    index.update({('name', name_key(row)): row for row in legacy if counts[name_key(row)] == 1})
+    return df, index
+
+def find_previous(anime, previous):
+    key = row_key(anime)
+    prev = previous.get(('id', key)) if key else None
+    return prev if prev is not None else previous.get(('name', name_key(anime)))
+
+# 上次数据中该条目的标签，没有时为空串；详情页抓取失败时用它代替空标签，合并时不会抹掉已有标签
+def previous_tags(anime, previous):
+    prev = find_previous(anime, previous)
+    return '' if prev is None else _as_str(prev.get('tags'))
+
+# 列表页字段与上次一致且已有标签时可以复用标签，无需再抓详情页
+def reusable_tags(anime, previous):
+    prev = find_previous(anime, previous)
+    if prev is None or not _as_str(prev.get('tags')):
+        return None
+    for field in COMPARE_FIELDS:
+        if _as_str(anime.get(field)) != _as_str(prev.get(field)):
+            return None
+    return _as_str(prev['tags'])
+
+# 新数据按 subject id 原位覆盖旧数据，旧数据中未出现的行保留，新条目追加在末尾
+# 没有 id 的旧行由同名的全部新记录替换（放在第一个同名旧行的位置），不会留下过期的评分和排名
+def merge(previous_df, records, columns):
+    by_id = {row_key(r): r for r in records if row_key(r)}
+    by_name = {}
+    for r in records:
+        by_name.setdefault(name_key(r), []).append(r)
+    emitted = set()
+    merged = []
+
+    def emit(rows):
+        for r in rows:
+            if id(r) not in emitted:
+                emitted.add(id(r))
+                merged.append(r)
+
+    for row in previous_df.to_dict('records'):
+        key = row_key(row)
+        if key:
+            new = by_id.get(key)
+            emit([new] if new is not None else [row])
+        else:
+            emit(by_name.get(name_key(row)) or [row])
+    emit(records)
+    return pd.DataFrame(merged, columns=columns)
@@ -0,0 +1,119 @@
+import os
+
+import matplotlib.font_manager as fm
+
+from tag_normalize import JP2CN_TAG_MAP
+
+# 看板语言包：界面文字、题材标签的展示名，以及展示名到数据中（中文）标签的对照
+# 新增语言只需在 LOCALES 中加一项，分析逻辑都在 dashboard_app.py 中共用
+
+JP_FONT_PATH = os.path.join(os.path.dirname(__file__), 'fonts', 'NotoSansJP-Regular.ttf')
+if os.path.exists(JP_FONT_PATH):
+    fm.fontManager.addfont(JP_FONT_PATH)
+    JP_FONTS = ['Noto Sans JP']
+else:
+    JP_FONTS = ['IPAexGothic', 'Noto Sans CJK JP', 'Yu Gothic', 'MS Gothic', 'SimHei', 'Arial Unicode MS', 'Microsoft YaHei']
+
+CN_TOPIC_TAGS = [
+    "奇幻", "搞笑", "战斗", "日常", "治愈", "恋爱", "校园", "热血", "科幻",
+    "百合", "冒险", "后宫", "萌", "青春", "穿越", "音乐", "悬疑", "童年", "偶像",
+    "玄幻", "剧情", "机战", "龙傲天", "卖肉", "萝卜", "运动", "萝莉", "女性向",
+    "竞技", "动作", "猎奇", "历史", "魔法", "纯爱", "乙女向", "战争", "肉", "励志",
+    "魔法少女", "超能力", "催泪", "武侠", "吐槽", "肉番", "耽美", "萌系"
+]
+
+LOCALES = {
+    'cn': {
+        'language': '中文',
+        'page_title': "Bangumi 动漫数据分析",
+        'fonts': ['SimHei', 'Arial Unicode MS', 'Microsoft YaHei'],
+        'all': '全部',
+        'topic_tags': CN_TOPIC_TAGS,
+        'tag_map': {},
+        'year_select': "选择年份区间",
+        'tag_select': "选择题材/风格标签",
+        'backend_select': "图表渲染方式",
+        'backends': {'静态图片': 'matplotlib', '交互图表 (Vega-Lite)': 'vega-lite'},
+        'current_range': '当前年份区间: {year_range}',
+        'year_distribution': '筛选后数据年份分布:',
+        'table_title': "### {start}-{end}年{tag} 动漫数据",
+        'sort_select': "排序方式",
+        'sort_options': {'评分': 'score', '排行': 'rank', '评分人数': 'score_count', '加权评分': 'weighted_score'},
+        'ascending': "升序",
+        'page': "页码",
+        'columns': {
+            'name': '中文名',
+            'name_cn': '日文名',
+            'info': '集数/首播时间/主创人员',
+            'score': '评分',
+            'score_count': '评分人数',
+            'rank': '排行',
+            'year': '年份',
+            'tags': '标签',
+            'weighted_score': '加权评分',
+        },
+        'caption': '共 {total} 条，第 {page}/{n_pages} 页',
+        'score_hist': "评分分布",
+        'score': '评分',
+        'count': '数量',
+        'year': '年份',
+        'mean_score': '平均评分',
+        'trend': "历年平均评分趋势（仅筛选结果）",
+        'tag_trend': "{tag} 历年平均评分趋势",
+        'top_tags_trend': "高频题材/风格标签历年平均评分趋势",
+        'tag_legend': None,
+        'similar_title': "相似作品",
+        'similar_search': "输入作品名搜索",
+        'similar_select': "选择作品",
+        'similar_missing': "相似索引尚未构建或与当前数据不一致，请先运行 python bangumi/similarity.py",
+        'similar_no_match': "没有找到匹配的作品",
+        'similarity': '相似度',
+    },
+    'jp': {
+        'language': '日本語',
+        'page_title': "Bangumi アニメデータ分析",
+        'fonts': JP_FONTS,
+        'all': '全部',
+        'topic_tags': list(JP2CN_TAG_MAP),
+        'tag_map': JP2CN_TAG_MAP,
+        'year_select': "年区間を選択",
+        'tag_select': "ジャンル・テーマを選択",
+        'backend_select': "グラフ表示方式",
+        'backends': {'静的画像': 'matplotlib', 'インタラクティブ (Vega-Lite)': 'vega-lite'},
+        'current_range': '現在の年区間: {year_range}',
+        'year_distribution': 'フィルタ後のデータ年分布:',
+        'table_title': "### {start}年～{end}年{tag} アニメデータ",
+        'sort_select': "並び替え",
+        'sort_options': {'評価': 'score', 'ランキング': 'rank', '評価人数': 'score_count', '加重評価': 'weighted_score'},
+        'ascending': "昇順",
+        'page': "ページ",
+        'columns': {
+            'name_cn': 'アニメタイトル',
+            'name': '中国語タイトル',
+            'info': '話数/放送日/スタッフ',
+            'score': '評価',
+            'score_count': '評価人数',
+            'rank': 'ランキング',
+            'year': '年',
+            'tags': 'タグ',
+            'weighted_score': '加重評価',
+        },
+        'caption': '全 {total} 件、{page}/{n_pages} ページ',
+        'score_hist': "評価分布",
+        'score': '評価',
+        'count': '件数',
+        'year': '年',
+        'mean_score': '平均評価',
+        'trend': "年別平均評価推移（フィルタ結果のみ）",
+        'tag_trend': "{tag} 年別平均評価推移",
+        'top_tags_trend': "高頻度ジャンル・テーマの年別平均評価推移",
+        'tag_legend': "ジャンル",
+        'similar_title': "似ている作品",
+        'similar_search': "作品名で検索",
+        'similar_select': "作品を選択",
+        'similar_missing': "類似インデックスが未作成か、現在のデータと一致しません。先に python bangumi/similarity.py を実行してください",
+        'similar_no_match': "該当する作品が見つかりません",
+        'similarity': '類似度',
+    },
+}
+DEFAULT_LOCALE = 'cn'
@@ -0,0 +1,303 @@
+from collections import Counter as _Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+# 进程内指标：计数器、仪表和直方图，线程安全，只依赖标准库
+# 导出为 Prometheus 文本格式（HTTP /metrics 或文本文件）或定期追加到 JSONL 日志
+# 爬虫和看板在热路径上直接调用 REGISTRY 中的指标，未启用导出时只有一次加锁和加法的开销
+
+# 请求耗时等秒级指标的默认分桶
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f'标签应为 {labelnames}，实际为 {sorted(labels)}')
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(n, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for n, v in pairs]
+    return '{' + ','.join(f'{n}="{v}"' for n, v in escaped) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help='', labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        with self.lock:
+            return list(self.values.items())
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+    def total(self):
+        return sum(v for _, v in self.samples())
+
+    def lines(self):
+        return [f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(v)}'
+                for key, v in self.samples()]
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+    def lines(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}'
+                for key, v in self.samples()]
+
+# 直方图：每组标签保存各分桶计数、总和与样本数，输出时按 Prometheus 约定累计
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help='', labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    # 计时上下文：with hist.time(host=...): ...
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def sum(self, **labels):
+        state = self.values.get(_label_key(self.labelnames, labels))
+        return state[1] if state else 0.0
+
+    def total(self):
+        return sum(state[1] for _, state in self.samples())
+
+    def count(self):
+        return sum(state[2] for _, state in self.samples())
+
+    # 按分桶估计分位数（桶内线性插值），用于日志中的摘要
+    def quantile(self, q, **labels):
+        state = self.values.get(_label_key(self.labelnames, labels))
+        if not state or state[2] == 0:
+            return None
+        target = q * state[2]
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (math.inf,), state[0]):
+            if count and seen + count >= target:
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def lines(self):
+        lines = []
+        for key, (counts, total, n) in self.samples():
+            cumulative = 0
+            for upper, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = (('le', _format_value(upper)),)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {n}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    # 同名指标只注册一次，模块重复导入（如 Streamlit 重新运行脚本）时返回已有对象
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'指标 {name} 已以不同的类型或标签注册')
+            return metric
+
+    def counter(self, name, help='', labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help='', labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help='', labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            if metric.help:
+                lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.lines())
+        return '\n'.join(lines) + '\n'
+
+    # JSON 快照：计数器/仪表为数值，直方图为 count/sum/p50/p95
+    def snapshot(self):
+        data = {}
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            values = {}
+            for key, value in metric.samples():
+                label = ','.join(f'{n}={v}' for n, v in zip(metric.labelnames, key))
+                if metric.kind == 'histogram':
+                    labels = dict(zip(metric.labelnames, key))
+                    value = {'count': value[2], 'sum': value[1],
+                             'p50': metric.quantile(0.5, **labels), 'p95': metric.quantile(0.95, **labels)}
+                values[label] = value
+            data[metric.name] = values
+        return data
+
+REGISTRY = Registry()
+
+def write_prometheus(path, registry=REGISTRY):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(registry.to_prometheus())
+    os.replace(tmp, path)
+
+# Prometheus 拉取端点：后台线程提供 http://host:port/metrics
+def serve(port, host='0.0.0.0', registry=REGISTRY):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+    return server
+
+# 定期把指标快照追加到 JSONL 文件，每行 {"time": ..., "metrics": {...}}；stop() 时再写一次最终值
+class JsonlReporter:
+    def __init__(self, path, interval=10, registry=REGISTRY, extra=None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.extra = extra or {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True, name='metrics-jsonl')
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def write(self):
+        record = {'time': time.time(), **self.extra, 'metrics': self.registry.snapshot()}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.write()
+
+# 简易采样分析器：后台线程按固定间隔抓取所有线程的调用栈，汇总为 collapsed stack 格式
+# （每行 "帧;帧;帧 次数"），可直接用 flamegraph.pl / speedscope 生成火焰图
+class StackSampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = _Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True, name='stack-sampler')
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while not self.stopped.wait(self.interval):
+            # 跳过采样线程本身和指标导出线程
+            skip = {t.ident for t in threading.enumerate() if t.name.startswith(('metrics-', 'stack-sampler'))}
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self, path=None):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+        return self.stacks
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+import time
+
+# 以 URL 为键的本地页面缓存（sqlite），保存正文和 ETag/Last-Modified 用于条件请求
+class PageCache:
+    def __init__(self, path='bangumi_cache.sqlite', ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # 多进程分片共用同一缓存文件时等待写锁
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'url TEXT PRIMARY KEY, status INTEGER, body TEXT, '
+            'etag TEXT, last_modified TEXT, fetched_at REAL)'
+        )
+        self.conn.commit()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT status, body, etag, last_modified, fetched_at FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ['status', 'body', 'etag', 'last_modified', 'fetched_at']
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        return ttl is not None and time.time() - entry['fetched_at'] < ttl
+
+    def put(self, url, status, body, etag=None, last_modified=None):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                (url, status, body, etag, last_modified, time.time())
+            )
+            self.conn.commit()
+
+    # 304 未修改时只刷新抓取时间
+    def touch(self, url):
+        with self.lock:
+            self.conn.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
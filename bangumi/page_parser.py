@@ -0,0 +1,176 @@
+import re
+import threading
+
+from bs4 import BeautifulSoup
+
+from tag_normalize import clean_text
+
+TYPE_NAMES = ['tv', 'movie', 'ova', 'web', 'anime_comic', 'misc']
+SITE_URL = 'https://bangumi.tv'
+
+SUBJECT_PATTERN = re.compile(r'/subject/(\d+)')
+
+# 条目页 URL 中的 subject id（/subject/NNN），作为条目的唯一键；同名的不同条目 id 不同
+def subject_id(url):
+    m = SUBJECT_PATTERN.search(url or '')
+    return m.group(1) if m else ''
+
+def _type_name(class_list):
+    for c in class_list:
+        if c in TYPE_NAMES:
+            return c
+    return ''
+
+def _record(name, name_cn, info, score, score_count, rank, type_name, href):
+    return {
+        'name': name,
+        'name_cn': name_cn,
+        'info': info,
+        'score': score,
+        'score_count': score_count,
+        'rank': rank,
+        'type': type_name,
+        'subject_url': SITE_URL + href if href else '',
+        'subject_id': subject_id(href),
+    }
+
+# BeautifulSoup + html.parser，原始实现，作为其他后端的对照基准
+class Bs4Parser:
+    name = 'bs4'
+
+    def parse_list_page(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        items = soup.select('ul#browserItemList > li.item')
+        anime_data = []
+        for item in items:
+            name = item.select_one('div.inner h3 a.l')
+            name_cn = item.select_one('div.inner h3 small.grey')
+            info = item.select_one('div.inner p.info.tip')
+            score = item.select_one('div.inner p.rateInfo small.fade')
+            score_count = item.select_one('div.inner p.rateInfo span.tip_j')
+            rank = item.select_one('div.inner span.rank')
+            href = name['href'] if name and name.has_attr('href') else ''
+            anime_data.append(_record(
+                name.text.strip() if name else '',
+                name_cn.text.strip() if name_cn else '',
+                info.text.strip() if info else '',
+                score.text.strip() if score else '',
+                score_count.text.strip() if score_count else '',
+                rank.text.strip() if rank else '',
+                _type_name(item.get('class', [])),
+                href
+            ))
+        return anime_data
+
+    def parse_tags(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        tag_spans = soup.select('div.subject_tag_section div.inner a.l span')
+        tags = [span.text.strip() for span in tag_spans]
+        return clean_text(','.join(tags))
+
+# xpath 中按 class 精确匹配（等价于 css 的 .cls）
+def _cls(*names):
+    return ' and '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {n} ')" for n in names)
+
+# lxml 后端：C 实现的解析器，用预编译 xpath 代替逐条 css 查询
+class LxmlParser:
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self.fromstring = lxml.html.fromstring
+        self.items_xpath = etree.XPath(f"//ul[@id='browserItemList']/li[{_cls('item')}]")
+        inner = f".//div[{_cls('inner')}]"
+        self.field_xpaths = {
+            'name': etree.XPath(f"{inner}//h3//a[{_cls('l')}]"),
+            'name_cn': etree.XPath(f"{inner}//h3//small[{_cls('grey')}]"),
+            'info': etree.XPath(f"{inner}//p[{_cls('info', 'tip')}]"),
+            'score': etree.XPath(f"{inner}//p[{_cls('rateInfo')}]//small[{_cls('fade')}]"),
+            'score_count': etree.XPath(f"{inner}//p[{_cls('rateInfo')}]//span[{_cls('tip_j')}]"),
+            'rank': etree.XPath(f"{inner}//span[{_cls('rank')}]"),
+        }
+        self.tags_xpath = etree.XPath(
+            f"//div[{_cls('subject_tag_section')}]//div[{_cls('inner')}]//a[{_cls('l')}]//span"
+        )
+
+    def _parse_items(self, root):
+        anime_data = []
+        for item in self.items_xpath(root):
+            fields = {}
+            for key, xpath in self.field_xpaths.items():
+                found = xpath(item)
+                fields[key] = found[0] if found else None
+            name = fields['name']
+            text = {k: (v.text_content().strip() if v is not None else '') for k, v in fields.items()}
+            anime_data.append(_record(
+                text['name'], text['name_cn'], text['info'], text['score'],
+                text['score_count'], text['rank'],
+                _type_name((item.get('class') or '').split()),
+                name.get('href', '') if name is not None else ''
+            ))
+        return anime_data
+
+    def _parse_tag_spans(self, root):
+        tags = [span.text_content().strip() for span in self.tags_xpath(root)]
+        return clean_text(','.join(tags))
+
+    def parse_list_page(self, html):
+        if not html.strip():
+            return []
+        return self._parse_items(self.fromstring(html))
+
+    def parse_tags(self, html):
+        if not html.strip():
+            return ''
+        return self._parse_tag_spans(self.fromstring(html))
+
+# 定向提取：先按标记截取需要的片段，只解析列表区域/标签区域，跳过页面其余部分
+class TargetedParser(LxmlParser):
+    name = 'targeted'
+    LIST_MARKER = 'id="browserItemList"'
+    TAG_MARKER = 'class="subject_tag_section"'
+
+    @staticmethod
+    def _slice(html, marker, end_marker):
+        start = html.find(marker)
+        if start < 0:
+            return None
+        start = html.rfind('<', 0, start)
+        end = html.find(end_marker, start)
+        return html[start:] if end < 0 else html[start:end]
+
+    # 标记按原样匹配，页面写法不同（引号、多个 class 等）找不到标记时退回整页解析，不会静默返回空结果
+    def parse_list_page(self, html):
+        fragment = self._slice(html, self.LIST_MARKER, '<div id="multipage"')
+        if fragment is None:
+            return super().parse_list_page(html)
+        return self._parse_items(self.fromstring(f'<div>{fragment}</div>'))
+
+    def parse_tags(self, html):
+        start = html.find(self.TAG_MARKER)
+        if start < 0:
+            return super().parse_tags(html)
+        inner = html.find('class="inner"', start)
+        end = html.find('</div>', inner) if inner >= 0 else -1
+        if end < 0:
+            return super().parse_tags(html)
+        fragment = html[html.rfind('<', 0, start):end] + '</div></div>'
+        return self._parse_tag_spans(self.fromstring(f'<div>{fragment}</div>'))
+
+PARSERS = {
+    'bs4': Bs4Parser,
+    'lxml': LxmlParser,
+    'targeted': TargetedParser,
+}
+
+_local = threading.local()
+
+# 每个线程各自持有解析器实例（预编译的 xpath 不跨线程共享）
+def get_parser(name='bs4'):
+    if name not in PARSERS:
+        raise ValueError(f"未知的解析后端: {name}, 可选: {', '.join(PARSERS)}")
+    cache = _local.__dict__.setdefault('parsers', {})
+    if name not in cache:
+        cache[name] = PARSERS[name]()
+    return cache[name]
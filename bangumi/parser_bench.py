@@ -0,0 +1,86 @@
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+from page_parser import PARSERS, get_parser
+
+# 读取样本页面：页面缓存（sqlite）或保存的 html 目录，按内容区分列表页/详情页
+def load_pages(cache_path=None, html_dir=None, limit=None):
+    pages = []
+    if cache_path:
+        conn = sqlite3.connect(cache_path)
+        sql = 'SELECT url, body FROM pages WHERE status = 200'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        pages.extend(conn.execute(sql).fetchall())
+        conn.close()
+    if html_dir:
+        for path in sorted(glob.glob(os.path.join(html_dir, '*.html'))):
+            with open(path, encoding='utf-8') as f:
+                pages.append((path, f.read()))
+    list_pages = [(src, html) for src, html in pages if 'browserItemList' in html]
+    subject_pages = [(src, html) for src, html in pages if 'browserItemList' not in html]
+    return list_pages, subject_pages
+
+def parse_all(parser, list_pages, subject_pages):
+    lists = [parser.parse_list_page(html) for _, html in list_pages]
+    tags = [parser.parse_tags(html) for _, html in subject_pages]
+    return lists, tags
+
+# 一致性检查：每个后端的解析结果必须与 bs4 完全相同
+def check_parity(list_pages, subject_pages, backends):
+    expected = parse_all(get_parser('bs4'), list_pages, subject_pages)
+    ok = True
+    for name in backends:
+        if name == 'bs4':
+            continue
+        lists, tags = parse_all(get_parser(name), list_pages, subject_pages)
+        for (src, _), want, got in zip(list_pages, expected[0], lists):
+            if want != got:
+                ok = False
+                print(f"[{name}] 列表页解析不一致: {src}")
+        for (src, _), want, got in zip(subject_pages, expected[1], tags):
+            if want != got:
+                ok = False
+                print(f"[{name}] 标签解析不一致: {src}\n  bs4: {want}\n  {name}: {got}")
+    return ok
+
+# 微基准：每个后端重复解析全部样本页，输出每秒页数
+def benchmark(list_pages, subject_pages, backends, repeat=3):
+    for name in backends:
+        parser = get_parser(name)
+        for kind, pages, parse in [('列表页', list_pages, parser.parse_list_page),
+                                   ('详情页', subject_pages, parser.parse_tags)]:
+            if not pages:
+                continue
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for _, html in pages:
+                    parse(html)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10} {kind}: {len(pages) * repeat / elapsed:8.1f} 页/秒")
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML 解析后端一致性检查与性能对比')
+    parser.add_argument('--cache-path', default='bangumi_cache.sqlite', help='爬虫页面缓存')
+    parser.add_argument('--html-dir', help='保存的样本页面目录（*.html）')
+    parser.add_argument('--limit', type=int, default=500, help='从缓存读取的最多页面数')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backends', nargs='+', default=list(PARSERS), choices=list(PARSERS))
+    args = parser.parse_args()
+
+    cache_path = args.cache_path if os.path.exists(args.cache_path) else None
+    list_pages, subject_pages = load_pages(cache_path, args.html_dir, args.limit)
+    if not list_pages and not subject_pages:
+        print('没有可用的样本页面，请先运行爬虫生成缓存或指定 --html-dir')
+        return 1
+    print(f"样本: 列表页 {len(list_pages)}, 详情页 {len(subject_pages)}")
+    ok = check_parity(list_pages, subject_pages, args.backends)
+    print('解析结果一致' if ok else '存在解析不一致')
+    benchmark(list_pages, subject_pages, args.backends, args.repeat)
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
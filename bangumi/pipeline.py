@@ -0,0 +1,236 @@
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import hashlib
+import json
+import os
+import time
+
+import bangumi_crawler
+import data_analysis
+import data_deep_analysis
+import data_preprocess
+import feature_engineering
+from report_engine import add_report_args, report_options
+from score_model import MODEL_DIR
+from stats_cube import CUBE_FILE
+from tag_clustering import CLUSTER_FILE, CLUSTER_MODEL_FILE
+from tag_matrix import TAG_MATRIX_FILE, TAG_VOCAB_FILE
+
+# 流水线调度：抓取 -> 预处理 -> 特征工程 -> 分析，每个阶段声明输入、输出文件和依赖的代码模块
+# 阶段键 = 输入文件内容哈希 + 代码哈希 + 参数；键未变且输出都在时跳过该阶段
+# 上游阶段重跑但输出内容不变时，下游阶段同样跳过；互不依赖的阶段（两个分析阶段）在进程池中并行
+
+STATE_FILE = '.pipeline_state.json'
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), outputs=(), params=None, options=None, code=(), always=False):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        # 不影响结果的参数（并行度等），传给阶段函数但不计入阶段键
+        self.options = options or {}
+        # 阶段代码及其依赖的本地模块，修改后只有用到它们的阶段重跑
+        self.code = list(code)
+        # 结果取决于外部数据（网络）的阶段每次都执行
+        self.always = always
+
+# 模型目录和 sparse 模式的聚类结果既是深入分析的输入（已有时直接读取）也是输出（没有时训练/拟合并保存）
+def build_stages(args):
+    report = report_options(args)
+    workers = {'workers': report.pop('workers')}
+    reused = [MODEL_DIR] + ([CLUSTER_FILE, CLUSTER_MODEL_FILE] if args.cluster_mode == 'sparse' else [])
+    return [
+        Stage('crawl', bangumi_crawler.main, outputs=[data_preprocess.RAW_STORE],
+              params={'argv': ['--store', data_preprocess.RAW_STORE,
+                               '--start-year', str(args.start_year), '--end-year', str(args.end_year)]},
+              always=True),
+        Stage('preprocess', data_preprocess.run,
+              inputs=[data_preprocess.RAW_STORE, data_preprocess.RAW_FILE],
+              outputs=[data_preprocess.CLEANED_FILE, data_preprocess.CLEANED_PARQUET],
+              params={'verbose': False}, code=['data_preprocess', 'dataset_store', 'tag_normalize']),
+        Stage('features', feature_engineering.run,
+              inputs=[data_preprocess.CLEANED_PARQUET],
+              outputs=[feature_engineering.FEATURES_FILE, TAG_MATRIX_FILE, TAG_VOCAB_FILE, CUBE_FILE],
+              params={'min_freq': args.min_freq, 'top_k': args.top_k, 'verbose': False},
+              code=['feature_engineering', 'tag_matrix', 'tag_index', 'tag_normalize', 'stats_cube']),
+        Stage('analysis', data_analysis.run,
+              inputs=[feature_engineering.FEATURES_FILE, CUBE_FILE],
+              params=report, options=workers, code=['data_analysis', 'report_engine', 'stats_cube']),
+        Stage('deep_analysis', data_deep_analysis.run,
+              inputs=[feature_engineering.FEATURES_FILE, CUBE_FILE, TAG_MATRIX_FILE, TAG_VOCAB_FILE] + reused,
+              outputs=reused,
+              params={'cluster_mode': args.cluster_mode, 'k': args.k, **report}, options=workers,
+              code=['data_deep_analysis', 'report_engine', 'stats_cube', 'tag_matrix', 'tag_clustering',
+                    'score_model']),
+    ]
+
+# 文件内容哈希，按 (大小, 修改时间) 记忆，文件未改动时不重新读取；目录按相对路径排序后逐个文件哈希
+class ContentHasher:
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+
+    def hash_path(self, path):
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    digest.update(os.path.relpath(full, path).encode('utf-8'))
+                    digest.update(self.hash_file(full).encode('ascii'))
+            return digest.hexdigest()
+        if os.path.isfile(path):
+            return self.hash_file(path)
+        return None
+
+    def hash_file(self, path):
+        stat = os.stat(path)
+        cached = self.memo.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.memo[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return self.memo[path][2]
+
+def stage_key(stage, hasher):
+    key = {
+        'fn': f'{stage.fn.__module__}.{stage.fn.__qualname__}',
+        'params': stage.params,
+        'inputs': {path: hasher.hash_path(path) for path in stage.inputs},
+        'code': {name: hasher.hash_path(os.path.join(CODE_DIR, f'{name}.py')) for name in stage.code},
+    }
+    # 集合按排序后的列表序列化，键与 PYTHONHASHSEED 无关
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=sorted).encode('utf-8')).hexdigest()
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {'files': {}, 'stages': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_FILE):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+# 子进程中执行阶段函数；报表阶段返回 {图表名: (输出路径, 耗时)}，记录实际生成的图表文件
+def run_stage(fn, params):
+    start = time.perf_counter()
+    result = fn(**params)
+    produced = []
+    if isinstance(result, dict):
+        produced = [p for paths, _ in result.values() for p in paths]
+    return produced, time.perf_counter() - start
+
+# 阶段依赖：输入文件是另一个阶段的输出
+def stage_deps(stages):
+    producers = {path: stage.name for stage in stages for path in stage.outputs}
+    return {stage.name: {producers[p] for p in stage.inputs if p in producers and producers[p] != stage.name}
+            for stage in stages}
+
+def is_fresh(stage, key, state):
+    record = state['stages'].get(stage.name)
+    if stage.always or record is None or record['key'] != key:
+        return False
+    return all(os.path.exists(p) for p in stage.outputs + record.get('produced', []))
+
+# 按依赖顺序调度：依赖都完成的阶段计算键，未变则跳过，否则提交到进程池
+# selected 之外的阶段视为已完成（直接使用磁盘上的输出）；force 时忽略缓存
+def run_pipeline(stages, selected=None, force=False, jobs=2, state_path=STATE_FILE):
+    state = load_state(state_path)
+    hasher = ContentHasher(state['files'])
+    deps = stage_deps(stages)
+    by_name = {stage.name: stage for stage in stages}
+    selected = set(by_name) if selected is None else set(selected)
+    done = {name for name in by_name if name not in selected}
+    failed = set()
+    summary = {}
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            active = {name for name, _ in running.values()}
+            for stage in stages:
+                if stage.name in done or stage.name in failed or stage.name in active:
+                    continue
+                if deps[stage.name] & failed:
+                    failed.add(stage.name)
+                    summary[stage.name] = 'blocked'
+                    continue
+                if not deps[stage.name] <= done:
+                    continue
+                key = stage_key(stage, hasher)
+                if not force and is_fresh(stage, key, state):
+                    done.add(stage.name)
+                    summary[stage.name] = 'cached'
+                    print(f'[{stage.name}] 输入和代码未变，跳过')
+                    continue
+                print(f'[{stage.name}] 开始')
+                running[pool.submit(run_stage, stage.fn, {**stage.params, **stage.options})] = (stage.name, key)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, key = running.pop(future)
+                try:
+                    produced, seconds = future.result()
+                except BaseException as e:
+                    failed.add(name)
+                    summary[name] = 'failed'
+                    print(f'[{name}] 失败: {e!r}')
+                    continue
+                done.add(name)
+                summary[name] = f'{seconds:.1f}s'
+                print(f'[{name}] 完成，用时 {seconds:.1f}s')
+                # 阶段的键按运行前的输入计算；运行后刷新输出文件的哈希记忆，供下游使用
+                for path in by_name[name].outputs:
+                    hasher.hash_path(path)
+                # 输入同时是本阶段输出时按运行后的内容重新计算键，否则下次运行会因为自己写入的文件而重跑
+                if set(by_name[name].inputs) & set(by_name[name].outputs):
+                    key = stage_key(by_name[name], hasher)
+                state['stages'][name] = {'key': key, 'produced': produced, 'seconds': seconds}
+                state['files'] = hasher.memo
+                save_state(state, state_path)
+    return summary, failed
+
+def main():
+    parser = argparse.ArgumentParser(description='抓取 -> 预处理 -> 特征工程 -> 分析 流水线')
+    parser.add_argument('--crawl', action='store_true', help='包含抓取阶段（需要联网，每次都会执行）')
+    parser.add_argument('--start-year', type=int, default=2015)
+    parser.add_argument('--end-year', type=int, default=2024)
+    parser.add_argument('--only', help='只执行指定阶段，逗号分隔；其余阶段直接使用已有输出')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重跑所选阶段')
+    parser.add_argument('--jobs', type=int, default=2, help='同时执行的阶段数')
+    parser.add_argument('--state', default=STATE_FILE, help='阶段缓存状态文件')
+    parser.add_argument('--min-freq', type=int, default=1, help='特征工程：标签最少出现次数')
+    parser.add_argument('--top-k', type=int, help='特征工程：只保留出现最多的前 K 个标签')
+    parser.add_argument('--cluster-mode', choices=['hot', 'sparse'], default='hot', help='深入分析的聚类方式')
+    parser.add_argument('--k', type=int, default=8, help='sparse 模式的聚类数')
+    add_report_args(parser)
+    args = parser.parse_args()
+
+    stages = build_stages(args)
+    names = [stage.name for stage in stages]
+    if args.only:
+        selected = [name.strip() for name in args.only.split(',') if name.strip()]
+        unknown = set(selected) - set(names)
+        if unknown:
+            parser.error(f'未知阶段: {", ".join(sorted(unknown))}，可选: {", ".join(names)}')
+    else:
+        selected = [name for name in names if args.crawl or name != 'crawl']
+
+    summary, failed = run_pipeline(stages, selected, args.force, args.jobs, args.state)
+    for name in names:
+        if name in summary:
+            print(f'{name}: {summary[name]}')
+    if failed:
+        raise SystemExit(f'失败的阶段: {", ".join(sorted(failed))}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import time
+
+import data_analysis
+import data_deep_analysis
+import data_preprocess
+import feature_engineering
+import similarity
+from synthetic_data import SyntheticSource, write_synthetic
+
+BENCH_DIR = 'bench_data'
+BENCH_FILE = 'bench_results.json'
+SCALES = [10, 100, 1000]
+# 按依赖顺序执行；某个阶段失败后，同一规模下依赖它的阶段不再执行
+STAGES = ['generate', 'preprocess', 'features', 'analysis', 'deep_analysis', 'similarity', 'dashboard']
+
+# 流水线与看板基准：按真实数据分布生成 10×/100×/1000× 合成数据，逐阶段计时并记录内存峰值
+# 每个阶段在全新的子进程（spawn）中执行，峰值 RSS 不受其他阶段影响；结果输出为 JSON，便于比对回归
+
+def max_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def stage_preprocess():
+    data_preprocess.run(verbose=False)
+
+def stage_features():
+    feature_engineering.run(verbose=False)
+
+def stage_analysis():
+    data_analysis.run(out_dir='charts')
+
+def stage_deep_analysis():
+    data_deep_analysis.run(out_dir='charts')
+
+def stage_similarity():
+    similarity.run()
+
+# 看板交互路径：与 dashboard_app 相同的加载、筛选、排序翻页、图表和榜单调用，不启动 Streamlit 服务
+def stage_dashboard(repeat=5):
+    from charts import histogram_chart, render_png, render_vega_lite
+    from dashboard_data import DATA_FILE, SORT_COLUMNS, DashboardData, load_frame, page_rows, snapshot_path
+    from locales import CN_TOPIC_TAGS
+
+    timings = {}
+
+    def timed(name, fn, n=repeat):
+        samples = []
+        for _ in range(n):
+            start = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - start)
+        timings[name] = {'seconds': statistics.median(samples), 'min_seconds': min(samples),
+                         'runs': n, 'peak_rss_mb': max_rss_mb()}
+        return result
+
+    if os.path.exists(snapshot_path(DATA_FILE)):
+        os.remove(snapshot_path(DATA_FILE))
+    timed('load_csv', lambda: load_frame(DATA_FILE), 1)
+    df = timed('load_snapshot', lambda: load_frame(DATA_FILE))
+    data = timed('build_data', lambda: DashboardData(df), 1)
+
+    # 典型筛选：中间一半年份 + 数据中最常见的题材标签
+    years = data.years
+    year_range = (years[len(years) // 4], years[-1 - len(years) // 4])
+    topic_tags = data.locale_tags('cn', CN_TOPIC_TAGS)
+    tag = max((data.tag_vocab[i] for i in topic_tags.values()), key=data.tag_index.count)
+
+    def filter_rows():
+        show = df[(df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
+        show = show[data.tag_index.mask(tag)[show.index.to_numpy()]]
+        return show.index[show['rank'].notna()].to_numpy()
+
+    rows = timed('filter', filter_rows)
+    for col in SORT_COLUMNS:
+        timed(f'page_{col}', lambda: page_rows(df, rows, col, False, 2, 50, data.orders))
+    timed('score_hist_png', lambda: render_png(histogram_chart(df['score'].iloc[rows], bins=20)))
+    timed('score_hist_vega', lambda: render_vega_lite(histogram_chart(df['score'].iloc[rows], bins=20)))
+    cube = data.ranked_cube
+    timed('trend', lambda: cube.trend(tag, years=year_range))
+    timed('top_tags_trend', lambda: [cube.trend(data.tag_vocab[i], years=year_range) for i in topic_tags.values()])
+    timed('leaderboard', lambda: data.ranking.leaderboard(10, tag=tag, df=df, year=year_range[1]))
+    return timings
+
+STAGE_FUNCS = {
+    'preprocess': stage_preprocess,
+    'features': stage_features,
+    'analysis': stage_analysis,
+    'deep_analysis': stage_deep_analysis,
+    'similarity': stage_similarity,
+    'dashboard': stage_dashboard,
+}
+DEPENDS = {
+    'preprocess': 'generate',
+    'features': 'preprocess',
+    'analysis': 'features',
+    'deep_analysis': 'features',
+    'similarity': 'features',
+    'dashboard': 'preprocess',
+}
+
+# 子进程中执行：切换到该规模的数据目录，记录导入完成后的基线内存、耗时和峰值内存
+def _measure(work_dir, fn, args):
+    os.chdir(work_dir)
+    baseline = max_rss_mb()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        detail = fn(*args)
+    return {
+        'seconds': time.perf_counter() - start,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': max_rss_mb(),
+        'children_peak_rss_mb': max_rss_mb(resource.RUSAGE_CHILDREN),
+        'detail': detail,
+    }
+
+def measure(work_dir, fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, work_dir, fn, args).result()
+
+def generate(source_path, rows, seed):
+    source = SyntheticSource.load(source_path)
+    return {'rows': write_synthetic(source, rows, data_preprocess.RAW_FILE, seed)}
+
+# 一个规模下依次执行所选阶段，返回结果记录列表；看板的每条交互路径单独成一条记录
+def run_scale(scale, source_path, source_rows, stages, work_dir, seed=42, repeat=5, reuse_data=False):
+    rows = int(source_rows * scale)
+    scale_dir = os.path.abspath(os.path.join(work_dir, f'x{scale:g}'))
+    os.makedirs(scale_dir, exist_ok=True)
+    raw_exists = os.path.exists(os.path.join(scale_dir, data_preprocess.RAW_FILE))
+    records = []
+    failed = set()
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        if DEPENDS.get(stage) in failed:
+            failed.add(stage)
+            records.append({'scale': scale, 'rows': rows, 'stage': stage, 'error': 'skipped: dependency failed'})
+            continue
+        if stage == 'generate' and reuse_data and raw_exists:
+            continue
+        print(f'[x{scale:g}] {stage} ...', flush=True)
+        try:
+            if stage == 'generate':
+                result = measure(scale_dir, generate, os.path.abspath(source_path), rows, seed)
+            elif stage == 'dashboard':
+                result = measure(scale_dir, stage_dashboard, repeat)
+            else:
+                result = measure(scale_dir, STAGE_FUNCS[stage])
+        except Exception as e:
+            failed.add(stage)
+            records.append({'scale': scale, 'rows': rows, 'stage': stage, 'error': repr(e)})
+            print(f'[x{scale:g}] {stage} 失败: {e!r}')
+            continue
+        detail = result.pop('detail')
+        records.append({'scale': scale, 'rows': rows, 'stage': stage, **result})
+        print(f'[x{scale:g}] {stage}: {result["seconds"]:.2f}s, 峰值内存 {result["peak_rss_mb"]:.0f}MB')
+        if stage == 'dashboard':
+            for path, timing in detail.items():
+                records.append({'scale': scale, 'rows': rows, 'stage': f'dashboard.{path}', **timing})
+                print(f'    {path}: {timing["seconds"] * 1000:.1f}ms')
+    return records
+
+# 与基准结果比对：同规模同阶段耗时超过 tolerance 倍视为回归
+def compare(records, baseline_path, tolerance=1.5):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['scale'], r['stage']): r for r in json.load(f)['results'] if 'seconds' in r}
+    regressions = []
+    for r in records:
+        before = baseline.get((r['scale'], r['stage']))
+        if before is None or 'seconds' not in r or before['seconds'] <= 0:
+            continue
+        ratio = r['seconds'] / before['seconds']
+        if ratio > tolerance:
+            regressions.append((r['scale'], r['stage'], before['seconds'], r['seconds'], ratio))
+    for scale, stage, before, after, ratio in regressions:
+        print(f'回归 x{scale:g} {stage}: {before:.3f}s -> {after:.3f}s ({ratio:.2f}×)')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='流水线与看板基准测试（合成数据）')
+    parser.add_argument('--source', default=data_preprocess.RAW_FILE, help='合成数据的样本：爬虫输出的原始 csv')
+    parser.add_argument('--scales', type=float, nargs='+', default=SCALES, help='相对样本行数的放大倍数')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--work-dir', default=BENCH_DIR, help='各规模合成数据和中间结果的目录')
+    parser.add_argument('--output', default=BENCH_FILE, help='JSON 结果文件')
+    parser.add_argument('--repeat', type=int, default=5, help='看板交互路径的重复次数（取中位数）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse-data', action='store_true', help='已有合成数据时不重新生成')
+    parser.add_argument('--baseline', help='与之前的 JSON 结果比对，出现回归时返回非零')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='耗时超过基准的倍数视为回归')
+    args = parser.parse_args()
+
+    source_rows = len(SyntheticSource.load(args.source).df)
+    records = []
+    for scale in args.scales:
+        records.extend(run_scale(scale, args.source, source_rows, args.stages, args.work_dir,
+                                 args.seed, args.repeat, args.reuse_data))
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'source_rows': source_rows,
+        'seed': args.seed,
+        'results': records,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'基准结果已保存为 {args.output}')
+
+    failed = [r for r in records if 'error' in r]
+    if args.baseline and compare(records, args.baseline, args.tolerance):
+        return 1
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_preprocess import CLEANED_PARQUET
+from tag_index import TagIndex
+from tag_normalize import EncodedTags, normalize_tag
+
+RANKS_FILE = 'bangumi_anime_2015_2024_ranks.parquet'
+# 默认的分组排名维度
+GROUP_COLS = ['year', 'type']
+
+# 贝叶斯加权评分：评分人数少的条目向全体均分收缩
+# weighted = v/(v+m)*R + m/(v+m)*C，m 默认取评分人数的中位数，C 为全体条目的平均评分
+def bayesian_score(score, votes, m=None, prior=None):
+    score = pd.to_numeric(pd.Series(score), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    votes = pd.to_numeric(pd.Series(votes), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(score) & (votes > 0)
+    if m is None:
+        m = float(np.median(votes[valid])) if valid.any() else 0.0
+    if prior is None:
+        prior = float(score[valid].mean()) if valid.any() else 0.0
+    weighted = np.full(len(score), np.nan)
+    v = votes[valid]
+    weighted[valid] = v / (v + m) * score[valid] + m / (v + m) * prior
+    return weighted, m, prior
+
+# 一次全局排序得到所有排名：全局名次、各分组（年份/类型）内名次都由同一个排序顺序累计得到
+# 标签榜单同样基于全局顺序，按 (标签, 全局名次) 一次排序后切片，榜单查询时不再排序
+class Ranking:
+    def __init__(self, weighted, order, ranks, tag_rows=None, m=None, prior=None):
+        self.weighted = weighted
+        self.order = order
+        self.ranks = ranks
+        self.tag_rows = tag_rows or {}
+        self.m = m
+        self.prior = prior
+
+    @classmethod
+    def build(cls, df, tag_index=None, group_cols=GROUP_COLS, m=None, prior=None,
+              score_col='score', votes_col='score_count'):
+        weighted, m, prior = bayesian_score(df[score_col], df[votes_col], m, prior)
+        votes = pd.to_numeric(df[votes_col], errors='coerce').to_numpy(dtype=float, na_value=0)
+        valid = np.flatnonzero(~np.isnan(weighted))
+        # 加权评分降序，相同时评分人数多的在前
+        order = valid[np.lexsort((-votes[valid], -weighted[valid]))]
+        n = len(weighted)
+        position = np.full(n, n, dtype=np.int64)
+        position[order] = np.arange(len(order))
+
+        ranks = {'global': _ranks_from_order(n, order, np.zeros(len(order), dtype=np.int8))}
+        for col in group_cols:
+            if col in df.columns:
+                ranks[col] = _ranks_from_order(n, order, df[col].iloc[order].to_numpy())
+
+        tag_rows = {}
+        if tag_index is not None:
+            for tag, rows in tag_index.items():
+                rows = rows[position[rows] < n]
+                tag_rows[tag] = rows[np.argsort(position[rows], kind='stable')]
+        return cls(weighted, order, ranks, tag_rows, m=m, prior=prior)
+
+    # 每行的排名表：加权评分、全局名次和各分组内名次（未参与排名的行为空）
+    def frame(self):
+        data = {'weighted_score': self.weighted}
+        for name, rank in self.ranks.items():
+            data[f'rank_{name}'] = pd.Series(rank, dtype='Int32').mask(rank == 0)
+        return pd.DataFrame(data)
+
+    # 榜单：按全局顺序（或标签榜单顺序）过滤年份/类型等条件，取前 n 行，不排序
+    # filters 为 {列名: 取值}，df 为构建时使用的数据；返回行号
+    def leaderboard(self, n=10, tag=None, df=None, **filters):
+        rows = self.tag_rows.get(tag, np.array([], dtype=np.int32)) if tag is not None else self.order
+        if filters:
+            keep = np.ones(len(rows), dtype=bool)
+            for col, value in filters.items():
+                keep &= (df[col].iloc[rows] == value).to_numpy(dtype=bool, na_value=False)
+            rows = rows[keep]
+        return rows[:n]
+
+    # 筛选后的行号按排名顺序排列：rows_mask 为布尔掩码，O(N) 过滤，不重新排序
+    def ordered(self, rows_mask):
+        return self.order[rows_mask[self.order]]
+
+def _ranks_from_order(n, order, groups):
+    rank = np.zeros(n, dtype=np.int64)
+    rank[order] = pd.Series(groups).groupby(groups, sort=False, dropna=False).cumcount().to_numpy() + 1
+    return rank
+
+def main():
+    parser = argparse.ArgumentParser(description='贝叶斯加权排名')
+    parser.add_argument('--m', type=float, help='先验评分人数，默认取评分人数中位数')
+    parser.add_argument('-n', type=int, default=10, help='打印榜单的条目数')
+    parser.add_argument('--tag', help='打印该标签的榜单')
+    parser.add_argument('--year', type=int, help='打印该年份的榜单')
+    args = parser.parse_args()
+
+    table = pq.read_table(CLEANED_PARQUET, columns=['name', 'name_cn', 'score', 'score_count', 'year', 'type', 'tag_ids'])
+    df = table.drop_columns(['tag_ids']).to_pandas()
+    ranking = Ranking.build(df, TagIndex.from_encoded(EncodedTags.from_table(table)), m=args.m)
+    ranks = pd.concat([df[['name', 'name_cn', 'score', 'score_count']], ranking.frame()], axis=1)
+    ranks.to_parquet(RANKS_FILE, index=False)
+    print(f'先验评分人数 m={ranking.m:g}，全体平均评分 C={ranking.prior:.3f}，排名已保存为 {RANKS_FILE}')
+
+    filters = {'year': args.year} if args.year is not None else {}
+    tag = normalize_tag(args.tag) if args.tag else None
+    rows = ranking.leaderboard(args.n, tag=tag, df=df, **filters)
+    print(ranks.iloc[rows].to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+# 批量报表引擎：图表声明为任务，各自声明依赖的数据（原始数据或共享聚合结果）
+# 聚合结果只计算一次并被多个图表/文字输出共用；图表在进程池中无界面渲染并写入输出目录
+# 绘图函数签名为 draw(ax, *inputs)，必须是模块级函数（要传给子进程）
+
+# 子进程中执行：新建 Figure（不经过 pyplot，不会弹出窗口），绘制后按各格式保存
+def render_chart(name, draw, inputs, figsize, out_dir, formats, rc=None):
+    start = time.perf_counter()
+    if rc:
+        matplotlib.rcParams.update(rc)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    draw(ax, *inputs)
+    fig.tight_layout()
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f'{name}.{fmt}')
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths, time.perf_counter() - start
+
+class Report:
+    def __init__(self, **sources):
+        self.values = dict(sources)
+        self.aggregates = {}
+        self.charts = []
+
+    # 注册共享聚合：fn(*deps) 在第一次被需要时计算一次
+    def aggregate(self, name, fn, deps=()):
+        self.aggregates[name] = (fn, list(deps))
+
+    def chart(self, name, draw, deps=(), figsize=(10, 6)):
+        self.charts.append((name, draw, list(deps), figsize))
+
+    def get(self, name):
+        if name not in self.values:
+            fn, deps = self.aggregates[name]
+            self.values[name] = fn(*[self.get(d) for d in deps])
+        return self.values[name]
+
+    # 按声明顺序准备每个图表的数据，准备好就提交渲染，后面图表的数据准备与前面图表的渲染并行
+    # max_workers=1 时在当前进程内顺序渲染；返回 {图表名: (输出路径列表, 渲染耗时)}
+    def render(self, out_dir='.', formats=('png',), max_workers=None, rc=None, names=None):
+        os.makedirs(out_dir, exist_ok=True)
+        charts = [c for c in self.charts if names is None or c[0] in names]
+        results = {}
+        if max_workers == 1:
+            for name, draw, deps, figsize in charts:
+                inputs = [self.get(d) for d in deps]
+                results[name] = render_chart(name, draw, inputs, figsize, out_dir, formats, rc)
+            return results
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for name, draw, deps, figsize in charts:
+                inputs = [self.get(d) for d in deps]
+                futures[name] = pool.submit(render_chart, name, draw, inputs, figsize, out_dir, formats, rc)
+            for name, future in futures.items():
+                results[name] = future.result()
+        return results
+
+def add_report_args(parser):
+    parser.add_argument('--out-dir', default='.', help='图表输出目录')
+    parser.add_argument('--formats', default='png', help='输出格式，逗号分隔，如 png,svg')
+    parser.add_argument('--workers', type=int, help='渲染进程数，默认 CPU 核数；1 表示不使用进程池')
+    parser.add_argument('--charts', help='只生成指定图表，逗号分隔')
+
+# 命令行参数 -> render_report 的关键字参数
+def report_options(args):
+    return {
+        'out_dir': args.out_dir,
+        'formats': [f.strip() for f in args.formats.split(',') if f.strip()],
+        'workers': args.workers,
+        'names': sorted({n.strip() for n in args.charts.split(',') if n.strip()}) if args.charts else None,
+    }
+
+def render_report(report, out_dir='.', formats=('png',), workers=None, names=None, rc=None):
+    results = report.render(out_dir, formats, workers, rc, names)
+    for name, (paths, seconds) in results.items():
+        print(f'{name}: {", ".join(paths)} ({seconds:.2f}s)')
+    return results
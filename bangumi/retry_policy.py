@@ -0,0 +1,104 @@
+from collections import deque
+import email.utils
+import random
+import threading
+import time
+
+from metrics import REGISTRY
+
+# 可重试的状态码：限流和服务端临时错误
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+RETRIES = REGISTRY.counter('crawler_retries', '重试次数（按原因：状态码或异常类型）', ['reason'])
+BREAKER_TRIPS = REGISTRY.counter('crawler_breaker_trips', '熔断次数（错误率过高或收到 429）', ['cause'])
+GLOBAL_RATE = REGISTRY.gauge('crawler_global_rate', '熔断器调整后的全局限速（请求/秒）')
+
+# Retry-After 可以是秒数或 HTTP 日期，返回需要等待的秒数，无法解析时为 None
+def parse_retry_after(value, now=None):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+# 重试策略：指数退避 + 全抖动（第 n 次重试前等待 0 ~ base*2^n 的随机时间，上限 max_delay），
+# 同时等待的线程不会在同一时刻一起重试；服务端给出 Retry-After 时至少等待该时长，
+# 超过 max_retry_after 则不再重试（交给死信队列稍后重抓）
+class RetryPolicy:
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30, max_retry_after=300,
+                 statuses=RETRY_STATUSES, seed=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.statuses = frozenset(statuses)
+        self.rng = random.Random(seed)
+
+    def should_retry(self, status):
+        return status in self.statuses
+
+    # 第 attempt 次（从 0 开始）失败后的等待秒数；次数用完或 Retry-After 过长时返回 None
+    def next_delay(self, attempt, retry_after=None):
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        backoff = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+# 熔断器：最近 window 个请求的错误率达到 error_rate，或收到带 Retry-After 的 429 时断开：
+# 所有线程暂停 cooldown（或 Retry-After）秒，全局限速减半（不低于基准的 min_factor 倍）；
+# 之后每个成功请求把限速加回基准的 recovery 倍，直到恢复基准速率（乘性减、加性增）
+class CircuitBreaker:
+    def __init__(self, limiter, window=20, error_rate=0.5, cooldown=10, min_factor=0.1, recovery=0.05):
+        self.limiter = limiter
+        self.base_rate = limiter.rate
+        self.window = window
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.min_factor = min_factor
+        self.recovery = recovery
+        self.outcomes = deque(maxlen=window)
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+        GLOBAL_RATE.set(self.base_rate)
+
+    # 断开期间阻塞调用线程
+    def wait(self):
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def record(self, ok, retry_after=None):
+        with self.lock:
+            self.outcomes.append(ok)
+            if ok:
+                if self.limiter.rate < self.base_rate:
+                    self._set_rate(min(self.base_rate, self.limiter.rate + self.base_rate * self.recovery))
+                return
+            if retry_after is not None:
+                self._trip(retry_after, 'retry_after')
+                return
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.window // 2 and failures / len(self.outcomes) >= self.error_rate:
+                self._trip(self.cooldown, 'error_rate')
+
+    def _trip(self, seconds, cause):
+        self.open_until = max(self.open_until, time.monotonic() + seconds)
+        self._set_rate(max(self.base_rate * self.min_factor, self.limiter.rate / 2))
+        self.outcomes.clear()
+        BREAKER_TRIPS.inc(cause=cause)
+        print(f"熔断: {cause}, 暂停 {seconds:.1f}s, 全局限速降为 {self.limiter.rate:.2f}/s")
+
+    def _set_rate(self, rate):
+        self.limiter.set_rate(rate)
+        GLOBAL_RATE.set(rate)
@@ -0,0 +1,226 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from data_preprocess import extract_info_fields
+from dataset_store import read_dataset
+from tag_matrix import encode_tags, load_display, load_tag_matrix, matrix_hash, select_tags
+
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
+MODEL_DIR = 'models'
+MODEL_NAME = 'high_score'
+# 评分不低于该值视为高分番剧
+HIGH_SCORE = 8.0
+
+ESTIMATORS = {
+    'rf': lambda n_estimators, n_jobs, seed: RandomForestClassifier(
+        n_estimators=n_estimators, n_jobs=n_jobs, random_state=seed),
+    'logreg': lambda n_estimators, n_jobs, seed: LogisticRegression(max_iter=1000, random_state=seed),
+}
+
+# 高分预测模型：特征为 标签多热（固定词表）+ 类型独热 + 归一化年份，均为稀疏矩阵
+# 词表、类型列表和年份范围随模型一起保存，新数据按训练时的编码方式转换
+class HighScoreModel:
+    def __init__(self, estimator, vocab, types, year_min, year_max, threshold=HIGH_SCORE, meta=None):
+        self.estimator = estimator
+        self.vocab = list(vocab)
+        self.types = list(types)
+        self.year_min = year_min
+        self.year_max = year_max
+        self.threshold = threshold
+        self.meta = meta or {}
+
+    # display 为 规范标签 -> 展示写法，给定时标签特征名使用展示写法
+    def feature_names(self, display=None):
+        display = display or {}
+        return [f'tag:{display.get(t, t)}' for t in self.vocab] + [f'type:{t}' for t in self.types] + ['year_norm']
+
+    # 由已编码的标签矩阵和类型/年份列拼出特征矩阵
+    def assemble(self, tag_matrix, types, years):
+        codes = pd.Index(self.types).get_indexer(pd.Series(types).astype(str))
+        rows = np.flatnonzero(codes >= 0)
+        type_matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, codes[rows])),
+                                    shape=(len(codes), len(self.types)))
+        years = pd.to_numeric(pd.Series(years), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        span = max(self.year_max - self.year_min, 1)
+        year_norm = np.nan_to_num((years - self.year_min) / span, nan=0.5)
+        return sp.hstack([tag_matrix.astype(np.float32), type_matrix,
+                          sp.csr_matrix(year_norm.reshape(-1, 1).astype(np.float32))], format='csr')
+
+    # df 需要 tags（逗号分隔）列、type 列，以及 year 列或可提取年份的 info 列
+    def features(self, df):
+        tags = df['tags']
+        if 'year' in df.columns:
+            years = df['year']
+        else:
+            years = extract_info_fields(df['info'])[0]
+        types = df['type'] if 'type' in df.columns else pd.Series('unknown', index=df.index)
+        return self.assemble(encode_tags(tags, self.vocab), types, years)
+
+    # 批量打分：一次向量化编码整批条目，返回高分概率
+    def predict_proba(self, df, batch_size=None):
+        X = self.features(df)
+        if batch_size is None or X.shape[0] <= batch_size:
+            return self.estimator.predict_proba(X)[:, 1]
+        return np.concatenate([self.estimator.predict_proba(X[i:i + batch_size])[:, 1]
+                               for i in range(0, X.shape[0], batch_size)])
+
+    def importances(self, n=20, display=None):
+        if hasattr(self.estimator, 'feature_importances_'):
+            values = self.estimator.feature_importances_
+        else:
+            values = np.abs(self.estimator.coef_[0])
+        return pd.Series(values, index=self.feature_names(display)).sort_values(ascending=False).head(n)
+
+# 训练数据的签名：行数、标签矩阵与词表的哈希、使用的标签数，保存在模型元数据中；不一致说明模型基于旧数据
+def data_signature(tag_matrix, vocab, top_k):
+    return {'rows': int(tag_matrix.shape[0]), 'matrix_hash': matrix_hash(tag_matrix, vocab), 'top_k': top_k}
+
+# 在特征表（行与标签矩阵一一对应）上训练，留出 test_size 做评估，并记录训练与推理耗时
+def train_model(df, tag_matrix, vocab, top_k=500, estimator='rf', n_estimators=200, n_jobs=-1,
+                threshold=HIGH_SCORE, test_size=0.2, seed=42):
+    signature = data_signature(tag_matrix, vocab, top_k)
+    tag_matrix, vocab = select_tags(tag_matrix, vocab, top_k)
+    years = pd.to_numeric(df['year'], errors='coerce')
+    model = HighScoreModel(None, vocab, sorted(df['type'].astype(str).unique()),
+                           int(years.min()), int(years.max()), threshold)
+    X = model.assemble(tag_matrix, df['type'], years)
+    y = (pd.to_numeric(df['score'], errors='coerce') >= threshold).to_numpy(dtype=int)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    model.estimator = ESTIMATORS[estimator](n_estimators, n_jobs, seed)
+    start = time.perf_counter()
+    model.estimator.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    proba = model.estimator.predict_proba(X_test)[:, 1]
+    predict_seconds = time.perf_counter() - start
+
+    model.meta = {
+        'estimator': estimator,
+        'n_estimators': n_estimators,
+        'n_jobs': n_jobs,
+        'n_tags': len(vocab),
+        'n_train': int(X_train.shape[0]),
+        'n_test': int(X_test.shape[0]),
+        'accuracy': float(accuracy_score(y_test, proba >= 0.5)),
+        'roc_auc': float(roc_auc_score(y_test, proba)) if len(np.unique(y_test)) > 1 else None,
+        'train_seconds': train_seconds,
+        'predict_rows_per_second': X_test.shape[0] / max(predict_seconds, 1e-9),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'data_signature': signature,
+    }
+    return model
+
+def _versions(model_dir=MODEL_DIR, name=MODEL_NAME):
+    versions = []
+    for path in glob.glob(os.path.join(model_dir, f'{name}_v*.joblib')):
+        match = re.search(r'_v(\d+)\.joblib$', path)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+def model_path(version, model_dir=MODEL_DIR, name=MODEL_NAME):
+    return os.path.join(model_dir, f'{name}_v{version:04d}.joblib')
+
+# 每次保存生成新版本号，模型文件旁写一份 json 元数据（指标、耗时、参数），便于比较各版本
+def save_model(model, model_dir=MODEL_DIR, name=MODEL_NAME):
+    os.makedirs(model_dir, exist_ok=True)
+    versions = _versions(model_dir, name)
+    version = versions[-1] + 1 if versions else 1
+    model.meta['version'] = version
+    path = model_path(version, model_dir, name)
+    # 只保存普通对象（估计器 + 编码参数），不依赖 HighScoreModel 所在模块的导入方式
+    joblib.dump({'estimator': model.estimator, 'vocab': model.vocab, 'types': model.types,
+                 'year_min': model.year_min, 'year_max': model.year_max,
+                 'threshold': model.threshold, 'meta': model.meta}, path)
+    with open(path[:-len('.joblib')] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(model.meta, f, ensure_ascii=False, indent=2)
+    return path
+
+# version 为 None 时读取最新版本；没有已保存的模型时返回 None
+def load_model(version=None, model_dir=MODEL_DIR, name=MODEL_NAME):
+    if version is None:
+        versions = _versions(model_dir, name)
+        if not versions:
+            return None
+        version = versions[-1]
+    return HighScoreModel(**joblib.load(model_path(version, model_dir, name)))
+
+def load_frame(path):
+    if os.path.isdir(path):
+        return read_dataset(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, encoding='utf-8-sig')
+
+def main():
+    parser = argparse.ArgumentParser(description='高分番剧预测模型')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = sub.add_parser('train', help='训练并保存新版本模型')
+    train_parser.add_argument('--estimator', choices=list(ESTIMATORS), default='rf')
+    train_parser.add_argument('--n-estimators', type=int, default=200)
+    train_parser.add_argument('--n-jobs', type=int, default=-1, help='并行进程数，-1 为全部 CPU')
+    train_parser.add_argument('--top-k', type=int, default=500, help='使用出现最多的前 K 个标签')
+
+    score_parser = sub.add_parser('score', help='用已保存的模型批量打分（csv/parquet 文件或抓取数据集目录）')
+    score_parser.add_argument('input')
+    score_parser.add_argument('--output', default='bangumi_anime_scored.csv')
+    score_parser.add_argument('--version', type=int, help='模型版本，默认最新')
+
+    bench_parser = sub.add_parser('bench', help='测试批量推理速度')
+    bench_parser.add_argument('--rows', type=int, default=100000)
+    bench_parser.add_argument('--batch-size', type=int, help='每批行数，默认整批')
+    bench_parser.add_argument('--version', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        df = pd.read_parquet(FEATURES_FILE, columns=['score', 'year', 'type'])
+        matrix, vocab = load_tag_matrix()
+        model = train_model(df, matrix, vocab, top_k=args.top_k, estimator=args.estimator,
+                            n_estimators=args.n_estimators, n_jobs=args.n_jobs)
+        path = save_model(model)
+        print(f'模型已保存为 {path}')
+        print(json.dumps(model.meta, ensure_ascii=False, indent=2))
+        print(model.importances(display=load_display()))
+        return
+
+    model = load_model(args.version)
+    if model is None:
+        raise SystemExit(f'{MODEL_DIR} 中没有已保存的模型，请先运行 train')
+    if args.command == 'score':
+        df = load_frame(args.input)
+        start = time.perf_counter()
+        df['high_score_proba'] = model.predict_proba(df)
+        print(f'{len(df)} 条打分完成，用时 {time.perf_counter() - start:.2f}s（模型 v{model.meta["version"]}）')
+        df.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f'结果已保存为 {args.output}')
+    else:
+        df = pd.read_parquet(FEATURES_FILE, columns=['tags', 'type', 'year'])
+        df = df.iloc[np.arange(args.rows) % len(df)].reset_index(drop=True)
+        start = time.perf_counter()
+        X = model.features(df)
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        model.predict_proba(df, args.batch_size)
+        total_seconds = time.perf_counter() - start
+        print(json.dumps({'version': model.meta['version'], 'rows': args.rows, 'n_features': X.shape[1],
+                          'encode_seconds': encode_seconds, 'predict_seconds': total_seconds,
+                          'rows_per_second': args.rows / total_seconds}, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from tag_matrix import load_tag_matrix
+
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
+# 相似索引目录：neighbors.npy / scores.npy 为每行最相似的 K 个条目及余弦相似度，可内存映射
+SIMILAR_INDEX_DIR = 'bangumi_anime_2015_2024_similar'
+
+# 标签集合的 TF-IDF 向量（平滑 idf，行 L2 归一化）：越少见的标签权重越高，"TV"、"日本" 这类标签几乎不起作用
+# min_df：出现次数少于该值的标签不参与相似度计算
+def tfidf(matrix, min_df=1):
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    doc_freq = np.asarray((matrix > 0).sum(axis=0)).ravel()
+    idf = np.log((1 + matrix.shape[0]) / (1 + doc_freq)) + 1
+    idf[doc_freq < min_df] = 0
+    return normalize(matrix @ sp.diags(idf.astype(np.float32)), norm='l2')
+
+# 离线计算精确的 top-K 余弦近邻：按行分块做稀疏矩阵乘法
+# 每块的内存峰值按每个相似度 12 字节估计：稀疏乘积（float32 值 + int32 列号）转为稠密 float32 时两者同时存在，
+# 之后稠密块与 argpartition 的 int64 下标同时存在；直接在稠密块上取最大的 k 个，不再复制取负
+def build_neighbors(X, k=50, memory_mb=256):
+    n_rows = X.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    neighbors = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+    chunk_size = max(1, (memory_mb * 2 ** 20) // (12 * n_rows))
+    XT = X.T.tocsc()
+    for start in range(0, n_rows, chunk_size):
+        end = min(start + chunk_size, n_rows)
+        sims = (X[start:end] @ XT).toarray()
+        # 排除自身
+        sims[np.arange(end - start), np.arange(start, end)] = -1
+        top = np.argpartition(sims, n_rows - k, axis=1)[:, n_rows - k:]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        del sims
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbors, scores
+
+def save_index(neighbors, scores, keys, meta, path=SIMILAR_INDEX_DIR):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'neighbors.npy'), neighbors)
+    np.save(os.path.join(path, 'scores.npy'), scores)
+    keys.to_parquet(os.path.join(path, 'keys.parquet'), index=False)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+# 只读的相似索引：近邻数组以内存映射方式打开，多个看板进程共享同一份页缓存
+# 索引按特征表的行号组织（同名条目各占一行），调用方按行号查询
+class SimilarityIndex:
+    def __init__(self, neighbors, scores, keys, meta=None):
+        self.neighbors = neighbors
+        self.scores = scores
+        self.keys = keys
+        self.meta = meta or {}
+        # 名称 -> 第一个同名条目的行号，只用于命令行按名称查询
+        self.name_rows = {}
+        for col in ['name', 'name_cn']:
+            for i, name in enumerate(keys[col]):
+                if isinstance(name, str):
+                    self.name_rows.setdefault(name, i)
+
+    @classmethod
+    def load(cls, path=SIMILAR_INDEX_DIR):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(np.load(os.path.join(path, 'neighbors.npy'), mmap_mode='r'),
+                   np.load(os.path.join(path, 'scores.npy'), mmap_mode='r'),
+                   pd.read_parquet(os.path.join(path, 'keys.parquet')), meta)
+
+    # 按原名或中文名定位行号（同名时取第一个），找不到时返回 None
+    def find(self, name):
+        return self.name_rows.get(name)
+
+    # 索引与 df 逐行对应（同一次预处理的结果）时才能按行号互查：行数相同且每行的原名、中文名一致
+    def aligned_with(self, df):
+        if len(df) != len(self.keys):
+            return False
+        return all(np.array_equal(self.keys[col].fillna('').astype(str).to_numpy(),
+                                  df[col].fillna('').astype(str).to_numpy()) for col in ['name', 'name_cn'])
+
+    # 第 row 行最相似的 k 个条目的行号及相似度（不含自身），相似度为 0 的不返回
+    def neighbor_rows(self, row, k=10):
+        rows = np.asarray(self.neighbors[row, :k])
+        scores = np.asarray(self.scores[row, :k])
+        keep = scores > 0
+        return rows[keep], scores[keep]
+
+    def neighbors_of(self, row, k=10):
+        rows, scores = self.neighbor_rows(row, k)
+        result = self.keys.iloc[rows].reset_index(drop=True)
+        result['similarity'] = scores
+        return result
+
+    # 与名为 name（原名或中文名）的条目相似的作品
+    def similar(self, name, k=10):
+        row = self.find(name)
+        if row is None:
+            return None
+        return self.neighbors_of(row, k)
+
+# 标签矩阵 + 特征表中的名称 -> 相似索引目录
+def run(top_k=50, min_df=2, memory_mb=256, path=SIMILAR_INDEX_DIR):
+    start = time.perf_counter()
+    matrix, _ = load_tag_matrix()
+    neighbors, scores = build_neighbors(tfidf(matrix, min_df), top_k, memory_mb)
+    keys = pd.read_parquet(FEATURES_FILE, columns=['name', 'name_cn'])
+    seconds = time.perf_counter() - start
+    save_index(neighbors, scores, keys, {'rows': int(matrix.shape[0]), 'top_k': int(neighbors.shape[1]),
+                                         'min_df': min_df, 'build_seconds': seconds}, path)
+    print(f'{matrix.shape[0]} 条目的相似索引（top {neighbors.shape[1]}）已保存到 {path}，用时 {seconds:.1f}s')
+
+def main():
+    parser = argparse.ArgumentParser(description='基于标签的相似番剧索引')
+    parser.add_argument('--top-k', type=int, default=50, help='每个条目保存的近邻数')
+    parser.add_argument('--min-df', type=int, default=2, help='标签最少出现次数')
+    parser.add_argument('--memory-mb', type=int, default=256, help='每块相似度矩阵的内存上限')
+    parser.add_argument('--query', help='不重建索引，直接查询与该作品相似的番剧')
+    parser.add_argument('-n', type=int, default=10, help='查询返回的条目数')
+    args = parser.parse_args()
+
+    if not args.query:
+        run(args.top_k, args.min_df, args.memory_mb)
+        return
+
+    index = SimilarityIndex.load()
+    start = time.perf_counter()
+    result = index.similar(args.query, args.n)
+    seconds = time.perf_counter() - start
+    if result is None:
+        raise SystemExit(f'索引中没有名为 {args.query} 的作品')
+    print(result.to_string())
+    print(f'查询用时 {seconds * 1000:.2f}ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+CUBE_FILE = 'bangumi_anime_2015_2024_cube.parquet'
+# 不区分标签的汇总行使用的标签名
+ALL_TAGS = ''
+DIMS = ['tag', 'year', 'type']
+MEASURES = ['count', 'sum', 'sumsq', 'min', 'max']
+
+# 年份 × 类型 × 标签 的评分统计立方体：每个格子保存 数量/评分和/平方和/最小值/最大值
+# 均值、方差都可以由这些量合并得到，两个立方体可直接相加实现增量更新
+class StatsCube:
+    def __init__(self, frame):
+        self.frame = frame.sort_index()
+
+    # df 为按位置对应 tag_index 行号的数据；row_mask 可进一步限定参与统计的行
+    @classmethod
+    def build(cls, df, tag_index=None, row_mask=None, score_col='score', year_col='year', type_col='type'):
+        scores = pd.to_numeric(df[score_col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        years = pd.to_numeric(df[year_col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        types = df[type_col].astype(str).to_numpy()
+        valid = ~np.isnan(scores) & ~np.isnan(years)
+        if row_mask is not None:
+            valid &= np.asarray(row_mask, dtype=bool)
+
+        row_parts = [np.flatnonzero(valid)]
+        tag_names = [ALL_TAGS]
+        if tag_index is not None:
+            for tag, rows in tag_index.items():
+                rows = rows[valid[rows]]
+                if len(rows):
+                    row_parts.append(rows)
+                    tag_names.append(tag)
+        rows = np.concatenate(row_parts)
+        codes = np.repeat(np.arange(len(row_parts)), [len(r) for r in row_parts])
+
+        long = pd.DataFrame({
+            'tag': pd.Categorical.from_codes(codes, categories=tag_names),
+            'year': years[rows].astype(np.int32),
+            'type': types[rows],
+            'score': scores[rows],
+        })
+        long['score2'] = long['score'] ** 2
+        grouped = long.groupby(DIMS, observed=True)
+        frame = pd.DataFrame({
+            'count': grouped['score'].count(),
+            'sum': grouped['score'].sum(),
+            'sumsq': grouped['score2'].sum(),
+            'min': grouped['score'].min(),
+            'max': grouped['score'].max(),
+        })
+        frame.index = frame.index.set_levels(frame.index.levels[0].astype(str), level='tag')
+        return cls(frame)
+
+    # 增量更新：新数据单独建立立方体后与旧立方体合并
+    def merge(self, other):
+        combined = pd.concat([self.frame, other.frame])
+        grouped = combined.groupby(level=DIMS)
+        frame = grouped[['count', 'sum', 'sumsq']].sum()
+        frame['min'] = grouped['min'].min()
+        frame['max'] = grouped['max'].max()
+        return StatsCube(frame[MEASURES])
+
+    def tags(self):
+        return [t for t in self.frame.index.get_level_values('tag').unique() if t != ALL_TAGS]
+
+    # 按 by 中的维度汇总，返回 count/mean/std/min/max；tag 为 ALL_TAGS 时统计全部条目
+    def query(self, by=('year',), tag=ALL_TAGS, years=None, types=None):
+        by = list(by)
+        try:
+            sel = self.frame.xs(tag, level='tag')
+        except KeyError:
+            sel = self.frame.iloc[0:0].droplevel('tag')
+        if years is not None:
+            year_values = sel.index.get_level_values('year')
+            sel = sel[(year_values >= years[0]) & (year_values <= years[1])]
+        if types is not None:
+            sel = sel[sel.index.get_level_values('type').isin(types)]
+        if by:
+            grouped = sel.groupby(level=by)
+            result = grouped[['count', 'sum', 'sumsq']].sum()
+            result['min'] = grouped['min'].min()
+            result['max'] = grouped['max'].max()
+        else:
+            result = pd.DataFrame([{'count': sel['count'].sum(), 'sum': sel['sum'].sum(),
+                                    'sumsq': sel['sumsq'].sum(), 'min': sel['min'].min(),
+                                    'max': sel['max'].max()}])
+        result['mean'] = result['sum'] / result['count']
+        variance = (result['sumsq'] / result['count'] - result['mean'] ** 2).clip(lower=0)
+        result['std'] = np.sqrt(variance)
+        return result[['count', 'mean', 'std', 'min', 'max']]
+
+    # 单个标签每年的平均评分
+    def trend(self, tag=ALL_TAGS, years=None, types=None):
+        return self.query(by=['year'], tag=tag, years=years, types=types)['mean']
+
+    def save(self, path=CUBE_FILE):
+        self.frame.reset_index().to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        return cls(pd.read_parquet(path).set_index(DIMS))
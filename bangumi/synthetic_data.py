@@ -0,0 +1,83 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_preprocess import COL_NAMES, RAW_FILE, read_raw_csv
+
+SYNTHETIC_FILE = 'bangumi_anime_synthetic.csv'
+# 标记只出现一次的长尾标签，生成时替换为每行不同的后缀
+RARE_MARK = '\x00'
+
+# 合成数据：以爬虫原始 csv 为样本放大到任意行数，字段格式与原始数据完全一致
+# 每行从样本中有放回抽取一行：标签组合（共现关系）、info（年份/集数）、评分人数、排名文本原样保留，
+# 评分加少量噪声；样本中只出现一次的长尾标签（声优、制作人员等）在每个合成行改名，
+# 头部标签的出现频率与样本一致，每行的长尾标签数也与样本一致，词表像真实数据一样随行数增长
+class SyntheticSource:
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        tags = self.df['tags'].fillna('')
+        freq = tags.str.split(',').explode().value_counts()
+        rare = set(freq.index[freq == 1]) - {''}
+        # 每个样本行的标签：常见标签原样保留，长尾标签带标记
+        marked = [','.join(t + RARE_MARK if t in rare else t for t in row.split(',')) if row else row
+                  for row in tags]
+        self.tags = np.array(marked, dtype=object)
+        self.has_rare = np.array([RARE_MARK in t for t in marked])
+        self.score = pd.to_numeric(self.df['score'], errors='coerce').to_numpy(dtype=float)
+        self.rare_tags = len(rare)
+
+    @classmethod
+    def load(cls, path=RAW_FILE):
+        return cls(read_raw_csv(path))
+
+    # 生成第 start 行起的 rows 行
+    def sample(self, rows, start=0, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        idx = rng.integers(0, len(self.df), size=rows)
+        row_ids = np.arange(start, start + rows).astype(str)
+        chunk = self.df.iloc[idx].reset_index(drop=True)
+        # 名称加行号，保证 原名+中文名 唯一；合成条目的 subject_id 为行号（从 1 开始）
+        chunk['name'] = chunk['name'].astype(str) + ' #' + row_ids
+        chunk['subject_id'] = (np.arange(start, start + rows) + 1).astype(str)
+        has_cn = chunk['name_cn'].notna()
+        chunk.loc[has_cn, 'name_cn'] = chunk.loc[has_cn, 'name_cn'].astype(str) + ' #' + row_ids[has_cn.to_numpy()]
+
+        score = self.score[idx] + rng.normal(0, 0.3, size=rows)
+        chunk['score'] = np.round(np.clip(score, 1, 10), 1)
+
+        tags = self.tags[idx]
+        rare = np.flatnonzero(self.has_rare[idx])
+        tags[rare] = [tags[i].replace(RARE_MARK, '_' + row_ids[i]) for i in rare]
+        chunk['tags'] = pd.Series(tags).replace('', np.nan)
+        return chunk[COL_NAMES]
+
+# 分块生成并追加写入 csv，内存占用与总行数无关；返回写入行数
+def write_synthetic(source, rows, path=SYNTHETIC_FILE, seed=42, chunk_size=200000):
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(chunk_size, rows - written)
+        chunk = source.sample(n, written, rng)
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0,
+                     index=False, encoding='utf-8-sig' if written == 0 else 'utf-8')
+        written += n
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='按真实数据分布生成合成数据')
+    parser.add_argument('--source', default=RAW_FILE, help='样本：爬虫输出的原始 csv')
+    parser.add_argument('--scale', type=float, default=10, help='放大倍数（相对样本行数）')
+    parser.add_argument('--rows', type=int, help='直接指定行数，优先于 --scale')
+    parser.add_argument('--output', default=SYNTHETIC_FILE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=200000)
+    args = parser.parse_args()
+
+    source = SyntheticSource.load(args.source)
+    rows = args.rows or int(len(source.df) * args.scale)
+    count = write_synthetic(source, rows, args.output, args.seed, args.chunk_size)
+    print(f'样本 {len(source.df)} 行（长尾标签 {source.rare_tags} 个）-> 合成 {count} 行，已保存为 {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from tag_matrix import TAG_MATRIX_FILE, TAG_VOCAB_FILE, load_display, load_tag_matrix, matrix_hash, select_tags
+
+FEATURES_FILE = 'bangumi_anime_2015_2024_features.parquet'
+# 每行的聚类结果（name/name_cn/cluster/svd_x/svd_y，行与特征表一一对应）
+CLUSTER_FILE = 'bangumi_anime_2015_2024_clusters.parquet'
+# 聚类模型：SVD 分量、质心、使用的标签词表、各聚类的标签占比
+CLUSTER_MODEL_FILE = 'bangumi_anime_2015_2024_clusters.npz'
+SIGNATURE_KEY = b'bangumi_cluster_signature'
+
+def _chunks(n_rows, chunk_size):
+    for start in range(0, n_rows, chunk_size):
+        yield start, min(start + chunk_size, n_rows)
+
+# 稀疏标签矩阵（行做 L2 归一化，按余弦相似度聚类）-> TruncatedSVD 低维表示 -> MiniBatchKMeans
+# SVD 只在不超过 fit_rows 行的随机样本上拟合，变换和 KMeans 都按 chunk_size 分块进行，内存占用与块大小相关
+# 聚类数不超过行数，SVD 维数不超过标签数 - 1 和样本行数；条目少于 2 个或标签少于 3 个（无法得到二维表示）时抛出 ValueError
+def fit_clusters(matrix, k=8, n_components=50, chunk_size=10000, fit_rows=100000, epochs=3, random_state=42):
+    n_rows, n_tags = matrix.shape
+    if n_rows < 2:
+        raise ValueError(f'只有 {n_rows} 个条目，至少需要 2 个才能聚类')
+    if n_tags < 3:
+        raise ValueError(f'标签词表只有 {n_tags} 个标签，至少需要 3 个才能聚类')
+    if k < 1:
+        raise ValueError(f'聚类数必须为正数: {k}')
+    k = min(k, n_rows)
+    rng = np.random.default_rng(random_state)
+    X = normalize(matrix.astype(np.float32), norm='l2', copy=True)
+    # SVD 维数同时不超过拟合样本的行数（行数很少时分解的秩有限）
+    n_components = max(2, min(n_components, n_tags - 1, min(n_rows, fit_rows)))
+    sample = np.sort(rng.choice(n_rows, fit_rows, replace=False)) if n_rows > fit_rows else slice(None)
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    svd.fit(X[sample])
+    n_components = svd.components_.shape[0]
+
+    embedding = np.empty((n_rows, n_components), dtype=np.float32)
+    for start, end in _chunks(n_rows, chunk_size):
+        embedding[start:end] = normalize(svd.transform(X[start:end]))
+
+    chunk_size = max(chunk_size, k)
+    kmeans = MiniBatchKMeans(n_clusters=k, batch_size=min(chunk_size, n_rows), random_state=random_state, n_init=3)
+    for _ in range(epochs):
+        order = rng.permutation(n_rows)
+        for start, end in _chunks(n_rows, chunk_size):
+            batch = embedding[np.sort(order[start:end])]
+            if len(batch) >= k:
+                kmeans.partial_fit(batch)
+    labels = np.empty(n_rows, dtype=np.int32)
+    for start, end in _chunks(n_rows, chunk_size):
+        labels[start:end] = kmeans.predict(embedding[start:end])
+
+    # 各聚类中每个标签的出现比例，直接在稀疏矩阵上按聚类求和
+    onehot = sp.csr_matrix((np.ones(n_rows, dtype=np.float32), (labels, np.arange(n_rows))), shape=(k, n_rows))
+    sizes = np.bincount(labels, minlength=k)
+    tag_share = np.asarray((onehot @ matrix).todense(), dtype=np.float32) / np.maximum(sizes, 1)[:, None]
+    return {
+        'labels': labels,
+        'embedding': embedding,
+        'centroids': kmeans.cluster_centers_.astype(np.float32),
+        'components': svd.components_.astype(np.float32),
+        'sizes': sizes,
+        'tag_share': tag_share,
+    }
+
+# 聚类结果的来源签名：聚类数、行数、标签矩阵与词表内容的哈希，任一变化都说明保存的结果已过期
+def cluster_signature(matrix, vocab, k):
+    return {'k': int(k), 'rows': int(matrix.shape[0]), 'matrix_hash': matrix_hash(matrix, vocab)}
+
+# 签名保存在聚类结果 parquet 的元数据中
+def save_clusters(result, vocab, keys, signature, cluster_path=CLUSTER_FILE, model_path=CLUSTER_MODEL_FILE):
+    assignments = keys.reset_index(drop=True).copy()
+    assignments['cluster'] = result['labels']
+    assignments['svd_x'] = result['embedding'][:, 0]
+    assignments['svd_y'] = result['embedding'][:, 1]
+    table = pa.Table.from_pandas(assignments, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           SIGNATURE_KEY: json.dumps(signature).encode()})
+    pq.write_table(table, cluster_path)
+    np.savez_compressed(model_path, centroids=result['centroids'], components=result['components'],
+                        sizes=result['sizes'], tag_share=result['tag_share'], vocab=np.array(vocab, dtype=str))
+
+# 读取已保存的聚类结果，分析脚本无需重新拟合
+def load_clusters(cluster_path=CLUSTER_FILE):
+    return pd.read_parquet(cluster_path)
+
+# 已保存结果的签名，结果或模型文件不存在、或是旧版文件（没有签名）时为 None
+def saved_signature(cluster_path=CLUSTER_FILE, model_path=CLUSTER_MODEL_FILE):
+    if not (os.path.exists(cluster_path) and os.path.exists(model_path)):
+        return None
+    value = (pq.read_schema(cluster_path).metadata or {}).get(SIGNATURE_KEY)
+    return json.loads(value) if value else None
+
+def load_cluster_model(model_path=CLUSTER_MODEL_FILE):
+    with np.load(model_path) as f:
+        model = {name: f[name] for name in f.files}
+    model['vocab'] = [str(t) for t in model['vocab']]
+    return model
+
+# 每个聚类中出现比例最高的 n 个标签；display 为 规范标签 -> 展示写法
+def top_cluster_tags(model, n=10, display=None):
+    display = display or {}
+    vocab = [display.get(t, t) for t in model['vocab']]
+    return [[(vocab[i], float(share[i])) for i in np.argsort(-share, kind='stable')[:n]]
+            for share in model['tag_share']]
+
+def main():
+    parser = argparse.ArgumentParser(description='基于稀疏标签矩阵的番剧聚类')
+    parser.add_argument('--k', type=int, default=8, help='聚类数')
+    parser.add_argument('--components', type=int, default=50, help='TruncatedSVD 维数')
+    parser.add_argument('--top-k', type=int, help='只使用出现最多的前 K 个标签，默认使用全部标签')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='分块处理的行数')
+    parser.add_argument('--fit-rows', type=int, default=100000, help='拟合 SVD 使用的最大行数')
+    parser.add_argument('--epochs', type=int, default=3, help='MiniBatchKMeans 遍历数据的轮数')
+    args = parser.parse_args()
+
+    matrix, vocab = load_tag_matrix(TAG_MATRIX_FILE, TAG_VOCAB_FILE)
+    matrix, vocab = select_tags(matrix, vocab, args.top_k)
+    result = fit_clusters(matrix, k=args.k, n_components=args.components, chunk_size=args.chunk_size,
+                          fit_rows=args.fit_rows, epochs=args.epochs)
+    keys = pd.read_parquet(FEATURES_FILE, columns=['name', 'name_cn'])
+    save_clusters(result, vocab, keys, cluster_signature(matrix, vocab, args.k))
+    print(f'{matrix.shape[0]} 行、{len(vocab)} 个标签聚为 {len(result["sizes"])} 类，结果已保存为 {CLUSTER_FILE} / {CLUSTER_MODEL_FILE}')
+    for i, tags in enumerate(top_cluster_tags(load_cluster_model(), display=load_display(TAG_VOCAB_FILE))):
+        print(f'聚类{i}（{result["sizes"][i]} 部）：' + '、'.join(f'{t} {s:.0%}' for t, s in tags))
+
+if __name__ == '__main__':
+    main()
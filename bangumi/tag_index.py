@@ -0,0 +1,73 @@
+import numpy as np
+
+from tag_normalize import EncodedTags
+
+# 标签倒排索引：标签 ID -> 升序行号数组（行号为 DataFrame 的位置下标），按 ID 连续存放（CSC 形式）
+# 第 i 个标签的行号为 row_ids[indptr[i]:indptr[i + 1]]；标签按规范标签精确匹配，不会出现 "萌" 匹配到 "萌系" 的子串误判
+class TagIndex:
+    def __init__(self, vocab, indptr, row_ids, n_rows):
+        self.vocab = list(vocab)
+        self.ids = {t: i for i, t in enumerate(self.vocab)}
+        self.indptr = indptr
+        self.row_ids = row_ids
+        self.n_rows = n_rows
+
+    # 由字典编码后的标签转置得到：按标签 ID 稳定排序，同一标签内行号保持升序
+    @classmethod
+    def from_encoded(cls, encoded):
+        rows = np.repeat(np.arange(len(encoded), dtype=np.int32), np.diff(encoded.indptr))
+        order = np.argsort(encoded.ids, kind='stable')
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(encoded.ids, minlength=len(encoded.vocab)))])
+        return cls(encoded.vocab, indptr, rows[order], len(encoded))
+
+    @classmethod
+    def from_tags(cls, tags, sep=','):
+        return cls.from_encoded(EncodedTags.from_tags(tags, sep))
+
+    # 标签名或标签 ID -> 标签 ID，不存在时为 None
+    def tag_id(self, tag):
+        if isinstance(tag, (int, np.integer)):
+            return int(tag) if 0 <= tag < len(self.vocab) else None
+        return self.ids.get(tag)
+
+    # (标签, 行号数组)，按 ID 顺序
+    def items(self):
+        for i, tag in enumerate(self.vocab):
+            yield tag, self.row_ids[self.indptr[i]:self.indptr[i + 1]]
+
+    def has(self, tag):
+        return self.tag_id(tag) is not None
+
+    def count(self, tag):
+        return len(self.rows(tag))
+
+    def rows(self, tag):
+        i = self.tag_id(tag)
+        if i is None:
+            return np.array([], dtype=np.int32)
+        return self.row_ids[self.indptr[i]:self.indptr[i + 1]]
+
+    # 多标签 OR：行号并集
+    def any_of(self, tags):
+        arrays = [self.rows(t) for t in tags]
+        return np.unique(np.concatenate(arrays)) if arrays else np.array([], dtype=np.int32)
+
+    # 多标签 AND：从最短的行号数组开始求交集
+    def all_of(self, tags):
+        arrays = sorted((self.rows(t) for t in tags), key=len)
+        if not arrays:
+            return np.arange(self.n_rows, dtype=np.int32)
+        result = arrays[0]
+        for arr in arrays[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, arr, assume_unique=True)
+        return result
+
+    # 行号转为布尔掩码，便于与年份等条件组合
+    def mask(self, rows):
+        if isinstance(rows, (str, int, np.integer)):
+            rows = self.rows(rows)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from tag_normalize import EncodedTags
+
+TAG_MATRIX_FILE = 'bangumi_anime_2015_2024_tags.npz'
+TAG_VOCAB_FILE = 'bangumi_anime_2015_2024_tags_vocab.json'
+
+# 标签多热编码为稀疏矩阵（CSR，行与特征表一一对应），词表按字典序排列
+# tags 为字典编码后的 EncodedTags（直接用 indptr+ids 构造，不再处理字符串），也可以是 EncodedTags.from_tags 接受的任意输入
+# min_freq：只保留出现次数不少于该值的标签；top_k：只保留出现最多的前 K 个标签
+def build_tag_matrix(tags, min_freq=1, top_k=None):
+    if not isinstance(tags, EncodedTags):
+        tags = EncodedTags.from_tags(tags)
+    matrix = tag_csr(tags)
+    vocab = np.asarray(tags.vocab, dtype=object)
+    freq = tags.counts()
+    keep = np.flatnonzero(freq >= min_freq)
+    if top_k is not None and len(keep) > top_k:
+        keep = np.sort(keep[np.argsort(-freq[keep], kind='stable')[:top_k]])
+    return matrix[:, keep], [str(t) for t in vocab[keep]], freq[keep]
+
+# 字典编码结果即 CSR 的 indptr/indices（行内 ID 已去重升序）
+def tag_csr(tags):
+    return sp.csr_matrix((np.ones(len(tags.ids), dtype=np.uint8), tags.ids, tags.indptr),
+                         shape=(len(tags), len(tags.vocab)))
+
+# 按出现次数取前 top_k 个标签列（None 表示全部），列顺序保持词表顺序
+def select_tags(matrix, vocab, top_k=None):
+    freq = np.asarray(matrix.sum(axis=0)).ravel()
+    cols = np.arange(matrix.shape[1])
+    if top_k is not None and top_k < len(cols):
+        cols = np.sort(np.argsort(-freq, kind='stable')[:top_k])
+    return matrix[:, cols], [vocab[i] for i in cols]
+
+# 按已有词表编码新数据（如新抓取的条目）：tags 为逗号分隔字符串或列表的序列，先按相同规则规范化，词表外的标签忽略
+def encode_tags(tags, vocab, sep=','):
+    return tag_csr(EncodedTags.from_tags(tags, sep, vocab=vocab))
+
+# 标签矩阵与词表内容的哈希，用于判断保存的模型/聚类结果是否基于当前数据
+def matrix_hash(matrix, vocab):
+    matrix = sp.csr_matrix(matrix)
+    digest = hashlib.sha1()
+    for part in [matrix.indptr, matrix.indices, matrix.data]:
+        digest.update(np.ascontiguousarray(part).tobytes())
+    digest.update(json.dumps(list(vocab), ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+# display 为 规范标签 -> 展示写法，与词表一起保存（词表只用于匹配，展示用 display）
+def save_tag_matrix(matrix, vocab, freq, matrix_path=TAG_MATRIX_FILE, vocab_path=TAG_VOCAB_FILE, display=None):
+    sp.save_npz(matrix_path, matrix)
+    display = display or {}
+    with open(vocab_path, 'w', encoding='utf-8') as f:
+        json.dump({'tags': vocab, 'freq': [int(x) for x in freq], 'display': [display.get(t, t) for t in vocab]},
+                  f, ensure_ascii=False)
+
+def load_vocab(vocab_path=TAG_VOCAB_FILE):
+    with open(vocab_path, encoding='utf-8') as f:
+        return json.load(f)['tags']
+
+# 规范标签 -> 展示写法；旧版词表文件没有展示写法时为空字典（调用方按规范标签展示）
+def load_display(vocab_path=TAG_VOCAB_FILE):
+    with open(vocab_path, encoding='utf-8') as f:
+        data = json.load(f)
+    return dict(zip(data['tags'], data.get('display', [])))
+
+def load_tag_matrix(matrix_path=TAG_MATRIX_FILE, vocab_path=TAG_VOCAB_FILE):
+    return sp.load_npz(matrix_path).tocsr(), load_vocab(vocab_path)
+
+# 只取出需要的标签列，转为稠密 DataFrame；词表中没有的标签补 0
+def load_tag_columns(tags, matrix_path=TAG_MATRIX_FILE, vocab_path=TAG_VOCAB_FILE):
+    matrix, vocab = load_tag_matrix(matrix_path, vocab_path)
+    return tag_columns(matrix, vocab, tags)
+
+def tag_columns(matrix, vocab, tags):
+    index = {t: i for i, t in enumerate(vocab)}
+    present = [t for t in tags if t in index]
+    dense = matrix[:, [index[t] for t in present]].toarray() if present else np.zeros((matrix.shape[0], 0))
+    df = pd.DataFrame(dense, columns=present, dtype=np.uint8)
+    for t in tags:
+        if t not in index:
+            df[t] = np.uint8(0)
+    return df[tags]
@@ -0,0 +1,227 @@
+import functools
+import json
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 标签规范化与字典编码：爬虫、预处理、特征工程和看板共用同一套规则
+# 规范化：去除不可见字符、全角转半角、小写、去掉空白和下划线，再做别名合并、过滤噪声标签
+# 字典编码：预处理时把每行标签一次性编码为整数 ID（CSR 形式），下游的倒排索引、稀疏矩阵和筛选都基于 ID
+
+# parquet schema 元数据中保存词表、展示写法的键
+TAG_VOCAB_KEY = b'bangumi_tag_vocab'
+TAG_DISPLAY_KEY = b'bangumi_tag_display'
+
+# 中日标签对照表
+JP2CN_TAG_MAP = {
+    "ファンタジー": "奇幻",
+    "コメディ": "搞笑",
+    "バトル": "战斗",
+    "日常": "日常",
+    "癒し": "治愈",
+    "恋愛": "恋爱",
+    "学園": "校园",
+    "熱血": "热血",
+    "SF": "科幻",
+    "百合": "百合",
+    "冒険": "冒险",
+    "ハーレム": "后宫",
+    "萌え": "萌",
+    "青春": "青春",
+    "異世界": "穿越",
+    "音楽": "音乐",
+    "サスペンス": "悬疑",
+    "子供向け": "童年",
+    "アイドル": "偶像",
+    "玄幻": "玄幻",
+    "ドラマ": "剧情",
+    "メカ": "机战",
+    "俺TUEEE": "龙傲天",
+    "エロ": "卖肉",
+    "ロボ": "萝卜",
+    "スポーツ": "运动",
+    "ロリ": "萝莉",
+    "女性向け": "女性向",
+    "競技": "竞技",
+    "アクション": "动作",
+    "グロ": "猎奇",
+    "歴史": "历史",
+    "魔法": "魔法",
+    "純愛": "纯爱",
+    "乙女向け": "乙女向",
+    "戦争": "战争",
+    "肉": "肉",
+    "励まし": "励志",
+    "魔法少女": "魔法少女",
+    "超能力": "超能力",
+    "感動": "催泪",
+    "武侠": "武侠",
+    "ツッコミ": "吐槽",
+    "エロアニメ": "肉番",
+    "BL": "耽美",
+    "萌系": "萌系"
+}
+
+# 同义/别名标签 -> 规范标签（改编来源统一为 "X改"，制作公司统一写法）
+TAG_ALIASES = {
+    '漫改': '漫画改',
+    '漫画改编': '漫画改',
+    '轻改': '轻小说改',
+    '轻小说改编': '轻小说改',
+    '小说改编': '小说改',
+    '游改': '游戏改',
+    '游戏改编': '游戏改',
+    '遊戲改': '游戏改',
+    '网络小说改': '网文改',
+    '韩国漫画改编': '韩漫改',
+    '泡面': '泡面番',
+    'TVA': 'TV',
+    'Production I.G': 'Production.I.G',
+    'ProductionI.G': 'Production.I.G',
+    'TMS Entertainment': 'TMS',
+}
+
+# 噪声标签：年份、年代、放送季度（2015、2015年、17年、2020s、20年代、2010-2019、2023年10月、2015年四月番、10月新番、17冬）
+NOISE_PATTERN = re.compile(
+    r'(?:19|20)?\d{2}(?:年代|s)'
+    r'|(?:19|20)\d{2}-(?:19|20)\d{2}'
+    r'|(?:(?:19|20)?\d{2}年?)?(?:\d{1,2}|[一二三四五六七八九十]{1,3})月(?:新?番)?'
+    r'|(?:19|20)?\d{2}年?[春夏秋冬]季?(?:新?番)?'
+    r'|(?:19|20)?\d{2}年(?:新?番)?|(?:19|20)\d{2}(?:新?番)?'
+)
+
+# 清理不可见字符
+def clean_text(text):
+    return ''.join(c for c in text if unicodedata.category(c)[0] != 'C')
+
+# 写法统一：全角转半角、小写，去掉空白和下划线（"A-1_Pictures" 与 "A-1Pictures" 视为同一标签）
+def _surface(tag):
+    tag = unicodedata.normalize('NFKC', clean_text(str(tag)))
+    return re.sub(r'[\s_]+', '', tag).lower()
+
+# 不含文字的作品名标签（统一后的写法），不按噪声处理
+TITLE_TAGS = frozenset({'86', '22/7', '2.43'})
+
+# 不含任何文字（只有数字、符号，如 "¬"、"7"、"3？"）或匹配年份/季度的标签视为噪声，TITLE_TAGS 中的作品名除外
+def is_noise(tag):
+    if tag in TITLE_TAGS:
+        return False
+    return not any(unicodedata.category(c)[0] == 'L' for c in tag) or NOISE_PATTERN.fullmatch(tag) is not None
+
+# 别名表按统一后的写法查找；日文标签并入对应的中文标签
+_ALIASES = {_surface(k): _surface(v) for k, v in {**JP2CN_TAG_MAP, **TAG_ALIASES}.items()}
+
+# 单个标签 -> 规范标签，噪声返回空串；结果按原始写法缓存，每种写法只计算一次
+@functools.lru_cache(maxsize=None)
+def normalize_tag(tag):
+    tag = _surface(tag)
+    tag = _ALIASES.get(tag, tag)
+    return '' if is_noise(tag) else tag
+
+# 逗号分隔的标签字段 -> 规范标签（去重、按字典序排列）的逗号分隔字段
+def normalize_tags_field(tags, sep=','):
+    return sep.join(sorted({t for t in map(normalize_tag, str(tags).split(sep)) if t}))
+
+# 字典编码后的标签：第 i 行的标签 ID 为 ids[indptr[i]:indptr[i + 1]]（int32，行内去重升序），vocab 为 ID -> 规范标签
+# 规范标签（统一写法后的键）只用于匹配；display 为 ID -> 展示写法，界面、图表和导出的标签字段使用展示写法
+class EncodedTags:
+    def __init__(self, indptr, ids, vocab, display=None):
+        self.indptr = indptr
+        self.ids = ids
+        self.vocab = list(vocab)
+        self.display = list(display) if display is not None else list(self.vocab)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    # tags 可以是逗号分隔字符串的序列、列表的序列或 Arrow list<string> 列；规范化只对去重后的原始写法执行
+    # 未给定 vocab 时按数据中出现的规范标签建立词表（字典序）；给定 vocab 时词表外的标签忽略
+    @classmethod
+    def from_tags(cls, tags, sep=',', vocab=None):
+        if isinstance(tags, (pa.Array, pa.ChunkedArray)):
+            if isinstance(tags, pa.ChunkedArray):
+                tags = tags.combine_chunks()
+            lengths = pc.list_value_length(tags).fill_null(0).to_numpy()
+            values = pc.list_flatten(tags).to_numpy(zero_copy_only=False)
+        else:
+            lists = pd.Series(tags).reset_index(drop=True)
+            if lists.map(lambda x: isinstance(x, str)).any():
+                lists = lists.fillna('').astype(str).str.split(sep)
+            lists = lists.map(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+            lengths = lists.map(len).to_numpy()
+            values = np.concatenate(lists.to_numpy()) if lengths.sum() else np.array([], dtype=object)
+        rows = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        canonical = [normalize_tag(t) for t in uniques]
+        if vocab is None:
+            vocab = sorted(set(canonical) - {''})
+        # 旧词表（如已保存的模型）同样按规范写法查找，重复时取第一个
+        lookup = {}
+        for i, t in enumerate(vocab):
+            lookup.setdefault(normalize_tag(t), i)
+        unique_ids = np.array([lookup.get(t, -1) if t else -1 for t in canonical], dtype=np.int64)
+        tag_ids = unique_ids[codes] if len(codes) else np.array([], dtype=np.int64)
+        keep = (codes >= 0) & (tag_ids >= 0)
+        # 按 (行号, 标签 ID) 排序去重，别名合并后同一行的重复标签只保留一个
+        n = max(len(vocab), 1)
+        pairs = np.unique(rows[keep] * n + tag_ids[keep])
+        indptr = np.searchsorted(pairs // n, np.arange(len(lengths) + 1)).astype(np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return cls(indptr, (pairs % n).astype(np.int32), vocab, display_names(vocab, uniques, unique_ids, counts))
+
+    # 从 tag_ids 列（list<int32>）和 schema 元数据中的词表恢复
+    @classmethod
+    def from_table(cls, table, column='tag_ids'):
+        ids = table.column(column).combine_chunks()
+        lengths = pc.list_value_length(ids).fill_null(0).to_numpy()
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        return cls(indptr, pc.list_flatten(ids).to_numpy().astype(np.int32), read_vocab(table.schema),
+                   read_display(table.schema))
+
+    # 每行的标签 ID 转为 Arrow list<int32> 列
+    def to_arrow(self):
+        return pa.ListArray.from_arrays(pa.array(self.indptr.astype(np.int32)), pa.array(self.ids))
+
+    # 每行标签的展示写法拼接为逗号分隔字段（Arrow 向量化拼接，不逐行处理）；重新编码时规范化回同一组 ID
+    def joined(self, sep=','):
+        names = pa.array(self.display, type=pa.string()).take(pa.array(self.ids))
+        lists = pa.ListArray.from_arrays(pa.array(self.indptr.astype(np.int32)), names)
+        return pc.binary_join(lists, sep).to_numpy(zero_copy_only=False)
+
+    # 每个标签出现的行数
+    def counts(self):
+        return np.bincount(self.ids, minlength=len(self.vocab))
+
+# 每个规范标签的展示写法：数据中出现最多的原始写法（去掉首尾空白），
+# 优先与规范标签本身同写法的原文（别名合并进来的写法只在没有时使用）；数据中没有的标签用规范标签
+def display_names(vocab, spellings, tag_ids, counts):
+    totals = {}
+    for spelling, tag_id, count in zip(spellings, tag_ids, counts):
+        if tag_id >= 0:
+            key = (int(tag_id), clean_text(str(spelling)).strip())
+            totals[key] = totals.get(key, 0) + int(count)
+    best = {}
+    for (tag_id, spelling), count in totals.items():
+        rank = (_surface(spelling) == vocab[tag_id], count)
+        if tag_id not in best or rank > best[tag_id][0] or (rank == best[tag_id][0] and spelling < best[tag_id][1]):
+            best[tag_id] = (rank, spelling)
+    return [best[i][1] if i in best else t for i, t in enumerate(vocab)]
+
+# 词表（及展示写法）写入 / 读取 Arrow 表的 schema 元数据，与 tag_ids 列一起保存在同一个 parquet 文件中
+def with_vocab(table, vocab, display=None):
+    metadata = {**(table.schema.metadata or {}), TAG_VOCAB_KEY: json.dumps(list(vocab), ensure_ascii=False).encode()}
+    if display is not None:
+        metadata[TAG_DISPLAY_KEY] = json.dumps(list(display), ensure_ascii=False).encode()
+    return table.replace_schema_metadata(metadata)
+
+def read_vocab(schema):
+    return json.loads((schema.metadata or {})[TAG_VOCAB_KEY])
+
+# 旧文件没有展示写法时为 None（使用规范标签）
+def read_display(schema):
+    value = (schema.metadata or {}).get(TAG_DISPLAY_KEY)
+    return json.loads(value) if value else None
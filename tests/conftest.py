@@ -0,0 +1,5 @@
+import os
+import sys
+
+# bangumi/ 下的脚本以目录内模块互相导入，测试时同样把该目录加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bangumi'))
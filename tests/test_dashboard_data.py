@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_data import page_rows, sort_orders
+
+# 索引标签不是行号时，预计算顺序与直接排序两条分支都要按位置取行且结果一致
+@pytest.mark.parametrize('ascending', [True, False])
+def test_page_rows_non_range_index(ascending):
+    df = pd.DataFrame({'score': [3.0, 1.0, np.nan, 2.0, 5.0, 4.0]}, index=[10, 20, 30, 40, 50, 60])
+    rows = np.array([0, 1, 2, 3, 5])
+    orders = sort_orders(df, ['score'])
+    expected = [1.0, 2.0, 3.0, 4.0] if ascending else [4.0, 3.0, 2.0, 1.0]
+    for page, size in [(1, 10), (1, 2), (2, 2)]:
+        plain = page_rows(df, rows, 'score', ascending, page, size)
+        cached = page_rows(df, rows, 'score', ascending, page, size, orders)
+        pd.testing.assert_frame_equal(plain, cached)
+        assert plain['score'].dropna().tolist() == expected[(page - 1) * size:page * size]
+    assert page_rows(df, rows, 'score', ascending, 3, 2).index.tolist() == [30]
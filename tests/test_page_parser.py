@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from page_parser import PARSERS
+from parser_bench import load_pages
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+LIST_PAGES, SUBJECT_PAGES = load_pages(html_dir=FIXTURE_DIR)
+
+def _fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+# 各后端对保存的列表页、详情页解析出的字段必须与 bs4 完全一致
+@pytest.mark.parametrize('backend', list(PARSERS))
+@pytest.mark.parametrize('src, html', LIST_PAGES, ids=[os.path.basename(src) for src, _ in LIST_PAGES])
+def test_list_page_parity(backend, src, html):
+    assert PARSERS[backend]().parse_list_page(html) == PARSERS['bs4']().parse_list_page(html)
+
+@pytest.mark.parametrize('backend', list(PARSERS))
+@pytest.mark.parametrize('src, html', SUBJECT_PAGES, ids=[os.path.basename(src) for src, _ in SUBJECT_PAGES])
+def test_tags_parity(backend, src, html):
+    assert PARSERS[backend]().parse_tags(html) == PARSERS['bs4']().parse_tags(html)
+
+# 基准结果本身要有内容：各后端一起返回空值时一致性检查也会通过
+@pytest.mark.parametrize('backend', list(PARSERS))
+def test_list_page_fields(backend):
+    records = PARSERS[backend]().parse_list_page(_fixture('list_2015_page1.html'))
+    assert [r['subject_id'] for r in records] == ['9717', '100449', '125900', '131234']
+    assert records[0] == {
+        'name': 'Fate/stay night [Unlimited Blade Works] 2nd season',
+        'name_cn': 'Fate/stay night [Unlimited Blade Works] 第二季',
+        'info': '12话 / 2015年4月4日 / 三浦貴博 / 奈須きのこ / TYPE-MOON / 須藤友徳 / 田畑壽之',
+        'score': '7.9',
+        'score_count': '(4235人评分)',
+        'rank': 'Rank 285',
+        'type': 'tv',
+        'subject_url': 'https://bangumi.tv/subject/9717',
+        'subject_id': '9717',
+    }
+    assert records[2]['name'] == '青春&友情 <剧场版>'
+    assert (records[2]['score'], records[2]['rank'], records[2]['type']) == ('', '', 'movie')
+    assert PARSERS[backend]().parse_list_page(_fixture('list_empty.html')) == []
+
+@pytest.mark.parametrize('backend', list(PARSERS))
+@pytest.mark.parametrize('name', ['subject_9717.html', 'subject_9717_variant.html'])
+def test_tags_fields(backend, name):
+    assert PARSERS[backend]().parse_tags(_fixture(name)) == 'Fate,ufotable,TYPE-MOON,2015年4月,奇幻,R&D,TV'
+
+# 页面写法与定向提取的标记不完全相同时也要解析出内容
+@pytest.mark.parametrize('backend', list(PARSERS))
+def test_variant_markup(backend):
+    parser = PARSERS[backend]()
+    assert parser.parse_list_page(_fixture('list_2015_page1_variant.html')) == \
+        parser.parse_list_page(_fixture('list_2015_page1.html'))